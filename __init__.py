@@ -10,19 +10,24 @@ bl_info = {
     "category" : "Import"
 }
 
-import bpy
+try:
+    import bpy
+except ImportError:
+    # imported outside Blender (probe CLI, worker processes), only the reader layer is usable
+    bpy = None
 
-from .importer import *
+if bpy is not None:
+    from .importer import *
 
-from .exporter import *
-from .panels import material_properties, material_panels, TMD2MaterialProperties, TMD2MeshProperties, TMD2Properties
-from bpy.props import PointerProperty
+    from .exporter import *
+    from .panels import material_properties, material_panels, TMD2MaterialProperties, TMD2MeshProperties, TMD2Properties, TMD2AddonPreferences, TMD2IndexProperties, update_cache_settings, update_bone_hashes
+    from bpy.props import PointerProperty
 
-classes = [
-    *material_properties,
-    *material_panels
-    
-]
+    classes = [
+        *material_properties,
+        *material_panels
+        
+    ]
 
 def register():
     for cls in classes:
@@ -30,10 +35,18 @@ def register():
     bpy.types.Material.tmd2_material = PointerProperty(type=TMD2MaterialProperties)
     bpy.types.Object.tmd2_mesh = PointerProperty(type=TMD2MeshProperties)
     bpy.types.Object.tmd2_props = PointerProperty(type=TMD2Properties)
+    bpy.types.Scene.tmd2_index = PointerProperty(type=TMD2IndexProperties)
+    
+    bpy.utils.register_class(TMD2AddonPreferences)
+    addon = bpy.context.preferences.addons.get(__package__)
+    if addon and addon.preferences:
+        update_cache_settings(addon.preferences, bpy.context)
+        update_bone_hashes(addon.preferences, bpy.context)
     
     bpy.utils.register_class(TMD2_IMPORTER_OT_IMPORT)
     bpy.utils.register_class(TMD2_EXPORTER_OT_EXPORT)
     bpy.utils.register_class(DropTMD2)
+    bpy.utils.register_class(TMD2_OT_BatchImport)
     bpy.utils.register_class(TMD2_FH_import)
     bpy.utils.register_class(DropTMD)
     bpy.utils.register_class(TMD_FH_import)
@@ -43,6 +56,8 @@ def register():
     bpy.utils.register_class(DropCAT)
     bpy.utils.register_class(TMO_FH_import)
     bpy.utils.register_class(DropTMO)
+    bpy.utils.register_class(TMD2_OT_UpdateIndex)
+    bpy.utils.register_class(TMD2_OT_ImportFromIndex)
 
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
     bpy.types.TOPBAR_MT_file_export.append(menu_func_export)
@@ -56,10 +71,13 @@ def unregister():
     del bpy.types.Material.tmd2_material
     del bpy.types.Object.tmd2_mesh
     del bpy.types.Object.tmd2_props
+    del bpy.types.Scene.tmd2_index
     
+    bpy.utils.unregister_class(TMD2AddonPreferences)
     bpy.utils.unregister_class(TMD2_IMPORTER_OT_IMPORT)
     bpy.utils.unregister_class(TMD2_EXPORTER_OT_EXPORT)
     bpy.utils.unregister_class(DropTMD2)
+    bpy.utils.unregister_class(TMD2_OT_BatchImport)
     bpy.utils.unregister_class(TMD2_FH_import)
     bpy.utils.unregister_class(DropTMD)
     bpy.utils.unregister_class(TMD_FH_import)
@@ -69,6 +87,8 @@ def unregister():
     bpy.utils.unregister_class(DropCAT)
     bpy.utils.unregister_class(TMO_FH_import)
     bpy.utils.unregister_class(DropTMO)
+    bpy.utils.unregister_class(TMD2_OT_UpdateIndex)
+    bpy.utils.unregister_class(TMD2_OT_ImportFromIndex)
 
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
     bpy.types.TOPBAR_MT_file_export.remove(menu_func_export)
\ No newline at end of file
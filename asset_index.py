@@ -0,0 +1,158 @@
+import os, sqlite3
+from .bone_hashes import bone_name
+from .probe import probe_files, find_files, texture_size
+from .tamLib.tmd2 import *
+
+INDEX_FILE_NAME = ".tmd2index.sqlite"
+INDEX_SCHEMA_VERSION = 1
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    kind TEXT,
+    size INTEGER,
+    mtime INTEGER,
+    version INTEGER,
+    model_flags INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS models (file_id INTEGER NOT NULL, name TEXT, hash INTEGER);
+CREATE TABLE IF NOT EXISTS bones (file_id INTEGER NOT NULL, idx INTEGER, hash INTEGER, name TEXT);
+CREATE TABLE IF NOT EXISTS materials (file_id INTEGER NOT NULL, hash INTEGER, shader_id TEXT);
+CREATE TABLE IF NOT EXISTS textures (file_id INTEGER NOT NULL, slot INTEGER, hash INTEGER, width INTEGER, height INTEGER);
+CREATE INDEX IF NOT EXISTS models_name ON models(name);
+CREATE INDEX IF NOT EXISTS models_hash ON models(hash);
+CREATE INDEX IF NOT EXISTS bones_hash ON bones(hash);
+CREATE INDEX IF NOT EXISTS bones_name ON bones(name);
+CREATE INDEX IF NOT EXISTS materials_shader ON materials(shader_id);
+CREATE INDEX IF NOT EXISTS textures_hash ON textures(hash);
+"""
+
+def default_index_path(root):
+    return os.path.join(root, INDEX_FILE_NAME)
+
+
+def open_index(db_path):
+    db = sqlite3.connect(db_path)
+    if db.execute("PRAGMA user_version").fetchone()[0] != INDEX_SCHEMA_VERSION:
+        db.executescript("""
+            DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS models; DROP TABLE IF EXISTS bones;
+            DROP TABLE IF EXISTS materials; DROP TABLE IF EXISTS textures;
+        """)
+        db.execute(f"PRAGMA user_version = {INDEX_SCHEMA_VERSION}")
+    db.executescript(schema)
+    return db
+
+
+def _remove_files(db, file_ids):
+    for table in ("models", "bones", "materials", "textures", "files"):
+        column = "id" if table == "files" else "file_id"
+        db.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(i,) for i in file_ids])
+
+
+def _dds_summary(path):
+    st = os.stat(path)
+    with open(path, 'rb') as f:
+        width, height = texture_size(f.read(20))
+    return {"path": path, "kind": "dds", "size": st.st_size, "mtime": st.st_mtime_ns,
+            "texture_sizes": [(width, height)],
+            "texture_hashes": [tamCRC32(os.path.splitext(os.path.basename(path))[0])]}
+
+
+def _insert_summary(db, summary):
+    cur = db.execute("INSERT INTO files (path, kind, size, mtime, version, model_flags, error) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (summary["path"], summary["kind"], summary["size"], summary["mtime"],
+                      summary.get("version"), summary.get("modelFlags"), summary.get("error")))
+    file_id = cur.lastrowid
+
+    db.executemany("INSERT INTO models VALUES (?, ?, ?)",
+                   [(file_id, name, h) for name, h in summary.get("model_names", [])])
+    db.executemany("INSERT INTO bones VALUES (?, ?, ?, ?)",
+                   [(file_id, i, h, bone_name(h)) for i, h in enumerate(summary.get("bone_hashes", []))])
+    db.executemany("INSERT INTO materials VALUES (?, ?, ?)",
+                   [(file_id, h, shader) for h, shader in summary.get("material_hashes", [])])
+
+    sizes = summary.get("texture_sizes", [])
+    hashes = summary.get("texture_hashes", [None] * len(sizes))
+    db.executemany("INSERT INTO textures VALUES (?, ?, ?, ?, ?)",
+                   [(file_id, i, h, w, ht) for i, (h, (w, ht)) in enumerate(zip(hashes, sizes))])
+
+
+# Probe the new or modified files under root, returns (probed, removed) file counts
+def update_index(db_path, root, workers = None):
+    paths = find_files(root)
+    for directory, _, files in os.walk(root):
+        paths.extend(os.path.join(directory, name) for name in files if name.lower().endswith(".dds"))
+
+    db = open_index(db_path)
+    try:
+        known = {path: (file_id, size, mtime) for file_id, path, size, mtime in
+                 db.execute("SELECT id, path, size, mtime FROM files")}
+
+        changed, stale = [], []
+        for path in paths:
+            st = os.stat(path)
+            entry = known.pop(path, None)
+            if entry and entry[1:] == (st.st_size, st.st_mtime_ns):
+                continue
+            if entry:
+                stale.append(entry[0])
+            changed.append(path)
+        stale.extend(entry[0] for entry in known.values())
+
+        dds_paths = [p for p in changed if p.lower().endswith(".dds")]
+        summaries = probe_files([p for p in changed if not p.lower().endswith(".dds")], workers)
+        summaries.extend(_dds_summary(p) for p in dds_paths)
+
+        with db:
+            _remove_files(db, stale)
+            for summary in summaries:
+                _insert_summary(db, summary)
+        return len(summaries), len(known)
+    finally:
+        db.close()
+
+
+# Paths of indexed files matching every filter, without kind texture hashes also match the LDS paired with a TMD2
+def query_files(db_path, bone = "", shader = "", texture = "", model = "", kind = ""):
+    clauses, params = [], []
+    if bone:
+        if bone.isdigit():
+            clauses.append("id IN (SELECT file_id FROM bones WHERE hash = ?)")
+            params.append(int(bone))
+        else:
+            clauses.append("id IN (SELECT file_id FROM bones WHERE name = ?)")
+            params.append(bone)
+    if shader:
+        clauses.append("id IN (SELECT file_id FROM materials WHERE shader_id = ?)")
+        params.append(shader)
+    if texture:
+        clauses.append("id IN (SELECT file_id FROM textures WHERE hash = ?)")
+        params.append(int(texture) if texture.isdigit() else tamCRC32(texture))
+    if model:
+        clauses.append("id IN (SELECT file_id FROM models WHERE name = ?)")
+        params.append(model)
+    if kind:
+        clauses.append("kind = ?")
+        params.append(kind)
+
+    sql = "SELECT path, kind FROM files"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+
+    db = open_index(db_path)
+    try:
+        rows = db.execute(sql + " ORDER BY path", params).fetchall()
+    finally:
+        db.close()
+
+    paths = []
+    for path, file_kind in rows:
+        paths.append(path)
+        if texture and not kind and file_kind == "tmd2":
+            # TMD2 textures live in the LDS next to it, in the same order
+            lds_path = os.path.splitext(path)[0] + ".lds"
+            if os.path.exists(lds_path) and lds_path not in paths:
+                paths.append(lds_path)
+    return paths
@@ -0,0 +1,188 @@
+import os, sys, json, struct
+from array import array
+from bisect import bisect_left
+from .cache import hash_cache
+
+# Bone names are only stored as hashes in the game files. The known names ship in hashes.json,
+# which is compiled on first use into a sorted array of hashes and a parallel list of names
+# and cached as a flat binary table, later sessions only read it back. Nothing is loaded at
+# import time.
+
+BUILTIN_DICTIONARY = os.path.join(os.path.dirname(__file__), "hashes.json")
+
+TABLE_MAGIC = b"TMDH"
+TABLE_VERSION = 1
+
+# magic, version, entry count, names size; followed by the uint32 hashes and the names
+table_header = struct.Struct("<4sIII")
+
+_user_dictionaries = []
+_table = None
+
+
+# Bone hash -> name lookup over a sorted array('I'), the reverse dict is only built when needed
+class BoneHashTable:
+    def __init__(self, keys = (), names = ()):
+        self.keys = array('I', keys)
+        self.names = list(names)
+        self._hashes = None
+
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        items = sorted((int(h), name) for h, name in mapping.items())
+        return cls((h for h, _ in items), (name for _, name in items))
+
+
+    def __len__(self):
+        return len(self.keys)
+
+
+    def __contains__(self, bone_hash):
+        return self.get(bone_hash) is not None
+
+
+    def get(self, bone_hash, default = None):
+        bone_hash = int(bone_hash)
+        i = bisect_left(self.keys, bone_hash)
+        if i < len(self.keys) and self.keys[i] == bone_hash:
+            return self.names[i]
+        return default
+
+
+    def hash_of(self, name, default = None):
+        if self._hashes is None:
+            self._hashes = dict(zip(self.names, self.keys))
+        return self._hashes.get(name, default)
+
+
+    def items(self):
+        return zip(self.keys, self.names)
+
+
+    # Add (hash, name) entries or a {hash: name} dict, they replace the names known for their hashes
+    def merge(self, entries):
+        if isinstance(entries, dict):
+            entries = entries.items()
+        merged = dict(self.items())
+        merged.update((int(h), name) for h, name in entries)
+        merged = BoneHashTable.from_mapping(merged)
+        self.keys, self.names, self._hashes = merged.keys, merged.names, None
+
+
+    # Write the table as little endian hashes followed by NUL separated UTF-8 names
+    def dump(self, f):
+        names = "\0".join(self.names).encode('utf-8')
+        keys = array('I', self.keys)
+        if sys.byteorder == "big":
+            keys.byteswap()
+        f.write(table_header.pack(TABLE_MAGIC, TABLE_VERSION, len(keys), len(names)))
+        keys.tofile(f)
+        f.write(names)
+
+
+    @classmethod
+    def load(cls, f):
+        magic, version, count, names_size = table_header.unpack(f.read(table_header.size))
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError("Unsupported bone table version.")
+        
+        keys = array('I')
+        keys.fromfile(f, count)
+        if sys.byteorder == "big":
+            keys.byteswap()
+        names = f.read(names_size).decode('utf-8').split("\0") if count else []
+        if len(names) != count:
+            raise ValueError("Truncated bone table.")
+        
+        table = cls()
+        table.keys, table.names = keys, names
+        return table
+
+
+# {hash: name} entries of a dictionary that fit the table, the others are reported and skipped
+def valid_entries(mapping, path):
+    if not isinstance(mapping, dict):
+        raise ValueError("expected an object mapping bone hashes to names")
+
+    entries = {}
+    skipped = 0
+    for key, name in mapping.items():
+        try:
+            bone_hash = int(key)
+        except (TypeError, ValueError):
+            bone_hash = -1
+        if 0 <= bone_hash < 1 << 32 and isinstance(name, str) and name and "\0" not in name:
+            entries[bone_hash] = name
+        else:
+            skipped += 1
+    if skipped:
+        print(f"Skipped {skipped} invalid entries in the bone name dictionary {path}.")
+    return entries
+
+
+# Read a hashes.json style {"hash": "name"} file, or a text file with one bone name per line
+def read_dictionary(path):
+    if os.path.splitext(path)[1].lower() == ".json":
+        with open(path, 'r', encoding='utf-8') as f:
+            return valid_entries(json.load(f), path)
+
+    from .tamLib.tmd2 import tamCRC32
+    with open(path, 'r', encoding='utf-8') as f:
+        names = [line.strip() for line in f]
+    return valid_entries({tamCRC32(name): name for name in names if name}, path)
+
+
+# Table of one dictionary, compiled only when its cached table is missing or out of date
+def load_dictionary(path):
+    key = hash_cache.key(path, "bone_hashes")
+    entry = hash_cache.get(key)
+    if entry is not None:
+        try:
+            with open(entry, 'rb') as f:
+                return BoneHashTable.load(f)
+        except (OSError, EOFError, ValueError, struct.error):
+            pass
+
+    table = BoneHashTable.from_mapping(read_dictionary(path))
+    try:
+        with hash_cache.writer(key) as f:
+            table.dump(f)
+    except OSError:
+        pass
+    return table
+
+
+# Return the bone name table, the built-in dictionary merged with the user ones
+def bone_hash_table():
+    global _table
+    if _table is None:
+        table = load_dictionary(BUILTIN_DICTIONARY)
+        for path in _user_dictionaries:
+            try:
+                table.merge(load_dictionary(path).items())
+            except Exception as e:
+                # a broken user dictionary must not break every import
+                print(f"Could not read the bone name dictionary {path}: {e}")
+        _table = table
+    return _table
+
+
+# User dictionaries merged over the built-in one (later ones win), the table is rebuilt on the next lookup
+def configure_bone_hashes(paths = ()):
+    global _table
+    _user_dictionaries[:] = [path for path in paths if path]
+    _table = None
+
+
+def bone_name(bone_hash, default = None):
+    return bone_hash_table().get(bone_hash, default)
+
+
+# Return the hash of a bone name, the dictionary's when it knows the name
+def bone_hash(name):
+    bone_hash = bone_hash_table().hash_of(name)
+    if bone_hash is None:
+        from .tamLib.tmd2 import tamCRC32
+        bone_hash = tamCRC32(name)
+    return bone_hash
@@ -0,0 +1,213 @@
+import os, sys, hashlib, pickle, struct, threading
+from contextlib import contextmanager
+
+
+def default_cache_directory():
+    # entries are unpickled, so they live in a per-user directory and never in the shared temp directory
+    try:
+        import bpy
+        return bpy.utils.extension_path_user(__package__, path="cache", create=True)
+    except Exception:
+        # outside Blender (worker processes get the parent's directory) or not installed as an extension
+        pass
+    
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(os.path.join("~", "AppData", "Local"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser(os.path.join("~", "Library", "Caches"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(os.path.join("~", ".cache"))
+    return os.path.join(base, "BlenderTMD2")
+
+
+# Whether path belongs to the current user and nobody else can write to it
+def owned_privately(path) -> bool:
+    if os.name == "nt":
+        # user profile directories aren't shared
+        return True
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+# Directory of cache entries keyed by source file identity, the least recently used ones are evicted past max_size bytes
+class DiskCache:
+    def __init__(self, directory, max_size, suffix = ".bin", enabled = True):
+        self.directory = directory
+        self.max_size = max_size
+        self.suffix = suffix
+        self.enabled = enabled
+
+
+    # Key a source file by its absolute path, size and modification time
+    def key(self, path, *extra) -> str:
+        st = os.stat(path)
+        ident = "|".join(str(x) for x in (os.path.abspath(path), st.st_size, st.st_mtime_ns, *extra))
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+
+    # A directory someone else could plant entries in is never read from or written to
+    def secure(self) -> bool:
+        return owned_privately(self.directory) and owned_privately(os.path.dirname(self.directory))
+
+
+    # Return the path of a cached entry, or None on a miss
+    def get(self, key: str):
+        if not self.secure():
+            return None
+        path = self.entry_path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+
+    # Yield a binary file for a new entry, it only becomes visible once fully written
+    @contextmanager
+    def writer(self, key: str):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        if not self.secure():
+            raise PermissionError(f"Not caching in {self.directory}, it isn't private to the current user.")
+        path = self.entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                yield f
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # the new entry is about to be opened, even if it's bigger than the whole cache
+        self.evict(protected=path)
+
+
+    # Return (path, size, last_used) for every entry, least recently used first
+    def entries(self):
+        result = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return result
+
+        for name in names:
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            result.append((path, st.st_size, st.st_mtime))
+
+        result.sort(key=lambda e: e[2])
+        return result
+
+
+    def evict(self, protected = None):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_size:
+                break
+            if path == protected:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # still mapped by a reader on Windows, try again next time
+                continue
+            total -= size
+
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+SIDECAR_MAGIC = b"TMDC"
+SIDECAR_VERSION = 1
+SIDECAR_ALIGNMENT = 64
+
+# magic, version, records size, buffer count
+sidecar_header = struct.Struct("<4sIQI")
+# offset, size
+sidecar_buffer = struct.Struct("<QQ")
+
+
+def _align(value, alignment = SIDECAR_ALIGNMENT):
+    return (value + alignment - 1) // alignment * alignment
+
+
+# Pickle a parsed model with its NumPy buffers written out of band, aligned so they can be mapped back without a copy
+def dump_sidecar(obj, f):
+    buffers = []
+    records = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [b.raw() for b in buffers]
+    
+    offset = _align(sidecar_header.size + sidecar_buffer.size * len(raw_buffers) + len(records))
+    table = []
+    for raw in raw_buffers:
+        table.append((offset, raw.nbytes))
+        offset = _align(offset + raw.nbytes)
+    
+    f.write(sidecar_header.pack(SIDECAR_MAGIC, SIDECAR_VERSION, len(records), len(raw_buffers)))
+    for entry in table:
+        f.write(sidecar_buffer.pack(*entry))
+    f.write(records)
+    
+    pos = sidecar_header.size + sidecar_buffer.size * len(table) + len(records)
+    for (offset, size), raw in zip(table, raw_buffers):
+        f.write(bytes(offset - pos))
+        f.write(raw)
+        pos = offset + size
+
+
+# Load a dump_sidecar object, without copy the arrays are read-only views into view
+def load_sidecar(view, copy = True):
+    magic, version, records_size, count = sidecar_header.unpack_from(view, 0)
+    if magic != SIDECAR_MAGIC or version != SIDECAR_VERSION:
+        raise ValueError("Unsupported sidecar version.")
+    
+    start = sidecar_header.size
+    table = [sidecar_buffer.unpack_from(view, start + i * sidecar_buffer.size) for i in range(count)]
+    start += sidecar_buffer.size * count
+    
+    buffers = [view[offset:offset + size] for offset, size in table]
+    if copy:
+        buffers = [bytearray(b) for b in buffers]
+    
+    return pickle.loads(view[start:start + records_size], buffers=buffers)
+
+
+payload_cache = DiskCache(os.path.join(default_cache_directory(), "payloads"), 1 << 30, ".bin")
+model_cache = DiskCache(os.path.join(default_cache_directory(), "models"), 1 << 30, ".tmdc")
+index_cache = DiskCache(os.path.join(default_cache_directory(), "indices"), 64 << 20, ".json")
+hash_cache = DiskCache(os.path.join(default_cache_directory(), "hashes"), 16 << 20, ".bin")
+
+
+# Archive indices and bone name tables are tiny and always cached, only payloads and models can be turned off
+def configure_cache(directory = None, max_size = None, enabled = None, models_enabled = None):
+    for cache in (payload_cache, model_cache, index_cache, hash_cache):
+        if directory:
+            cache.directory = os.path.join(directory, os.path.basename(cache.directory))
+    
+    for cache in (payload_cache, model_cache):
+        if max_size is not None:
+            cache.max_size = max_size
+            cache.evict()
+    
+    if enabled is not None:
+        payload_cache.enabled = enabled
+    if models_enabled is not None:
+        model_cache.enabled = models_enabled
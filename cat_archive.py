@@ -0,0 +1,212 @@
+import os, json, tempfile
+from contextlib import contextmanager
+from fnmatch import fnmatch
+from .reader import open_input, map_payload, parse_payload, inflate_to_file, pzze_file_format, writeCATS, BinaryReader, Endian, PZZEFile
+from .cache import index_cache, payload_cache
+from .workers import pipeline
+from .transport import share, attach
+
+# below this many members starting worker processes costs more than it saves
+PARALLEL_MEMBER_THRESHOLD = 4
+
+_worker_payloads = {}
+
+
+# Member table of a CATS archive, (sub archive, name, offset, size) entries into the mapped payload
+class CATSIndex:
+    def __init__(self, path, entries):
+        self.path = path
+        self.entries = entries
+        self._payload = None
+
+
+    def members(self, sub_archive = None, pattern = "*"):
+        return [e for e in self.entries
+                if (sub_archive is None or e[0] == sub_archive) and fnmatch(e[1], pattern)]
+
+
+    def find(self, name, sub_archive = None):
+        for entry in self.entries:
+            if entry[1] == name and (sub_archive is None or entry[0] == sub_archive):
+                return entry
+        raise KeyError(f"{name} not found in {os.path.basename(self.path)}")
+
+
+    def payload(self):
+        if self._payload is None:
+            self._payload = map_payload(self.path, "CAT")
+        return self._payload
+
+
+    # Return the raw bytes of one member as a view into the mapped payload
+    def extract(self, name, sub_archive = None):
+        _, _, offset, size = self.find(name, sub_archive)
+        return self.payload()[offset:offset + size]
+
+
+    # Parse one member, e.g. a TMD2 model from the mdl.cat sub archive
+    def parse(self, name, sub_archive = None, kind = "tmd2"):
+        obj = parse_payload(self.extract(name, sub_archive), kind, name)
+        obj.name = name
+        return obj
+
+
+    # Workers map the payload themselves and only get offsets, results come back through shared memory in a bounded window
+    def parse_many(self, names, sub_archive = None, kind = "tmd2", workers = None):
+        entries = [self.find(name, sub_archive) for name in names]
+        if workers == 1 or len(entries) < PARALLEL_MEMBER_THRESHOLD:
+            for entry in entries:
+                yield entry[1], self.parse(entry[1], entry[0], kind)
+            return
+        
+        with self.worker_payload() as path:
+            jobs = [(path, offset, size, name, kind) for _, name, offset, size in entries]
+            with pipeline(parse_member, jobs, workers, receive=attach) as results:
+                for (_, _, _, name, _), result, error in results:
+                    if error is not None:
+                        raise error
+                    obj, block = result
+                    with block:
+                        yield name, obj
+                    del obj, result
+    
+    
+    # Path of a file with the decompressed payload for the workers, inflated once rather than once per worker
+    @contextmanager
+    def worker_payload(self):
+        with open_input(self.path) as view:
+            compressed = view[:4] == b"PZZE"
+        if not compressed:
+            yield self.path
+            return
+        if payload_cache.enabled:
+            self.payload()
+            yield self.path
+            return
+        
+        fd, path = tempfile.mkstemp(suffix=".cat")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                with open_input(self.path) as view:
+                    inflate_to_file(view, f)
+            yield path
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Worker entry point, parses one member straight from the mapped payload
+def parse_member(path, offset, size, name, kind = "tmd2"):
+    payload = _worker_payloads.get(path)
+    if payload is None:
+        payload = _worker_payloads[path] = map_payload(path, "CAT")
+    obj = parse_payload(payload[offset:offset + size], kind, name)
+    obj.name = name
+    return share(obj)
+
+
+# Parse a CATS archive once and record where each member sits in its payload
+def build_cats_index(path):
+    payload = map_payload(path, "CAT")
+    cats = parse_payload(payload, "cats")
+
+    # members are stored back to back, so searching from the end of the previous one is cheap
+    data = payload.obj
+    entries = []
+    cursor = 0
+    for c in cats.subCATS:
+        for i in range(c.catCount):
+            member = c.subData[i]
+            offset = data.find(member, cursor)
+            if offset == -1:
+                offset = data.find(member)
+            if offset == -1:
+                raise ValueError(f"Could not locate {c.subNames[i]} in the CAT payload.")
+            entries.append((c.name, c.subNames[i], offset, len(member)))
+            cursor = offset + len(member)
+
+    return CATSIndex(path, entries)
+
+
+# Member index of a CATS archive, cached per source file so later opens only map the payload
+def open_cats_index(path):
+    key = index_cache.key(path, "cats")
+    entry = index_cache.get(key)
+    if entry is not None:
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                return CATSIndex(path, [tuple(e) for e in json.load(f)["entries"]])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    index = build_cats_index(path)
+    try:
+        with index_cache.writer(key) as f:
+            f.write(json.dumps({"entries": index.entries}).encode('utf-8'))
+    except OSError:
+        pass
+    return index
+
+
+def _member_bytes(member):
+    if isinstance(member, (bytes, bytearray, memoryview)):
+        return member
+    br = BinaryReader()
+    br.write_struct(member)
+    return br.buffer()
+
+
+def _replace_members(cats, payload, entries, replacements):
+    # kept out of repack_cats so no loop variable holds on to slices of the payload
+    members = {(sub_archive, name): (offset, size) for sub_archive, name, offset, size in entries}
+    missing = set(replacements)
+    for c in cats.subCATS:
+        for i in range(c.catCount):
+            key = (c.name, c.subNames[i])
+            if key in replacements:
+                c.subData[i] = _member_bytes(replacements[key])
+                missing.discard(key)
+            elif key in members:
+                # drop the parsed copy, the member is written from the mapped payload
+                offset, size = members[key]
+                if size == len(c.subData[i]):
+                    c.subData[i] = payload[offset:offset + size]
+    return missing
+
+
+# Write source to output (may be the same file) with some (sub archive, name) members replaced, untouched ones are copied from the mapped payload
+def repack_cats(source, output, replacements, profile = "balanced") -> dict:
+    file_format = None
+    with open_input(source) as view:
+        if view[:4] == b"PZZE":
+            file_format = pzze_file_format(view)
+            if file_format is None:
+                # a header this version doesn't recognize, let PZZEFile read it
+                pzze = BinaryReader(view, Endian.LITTLE).read_struct(PZZEFile)
+                file_format = getattr(pzze, "fileFormat", None) or "cat"
+                del pzze
+    
+    payload = map_payload(source, "CAT")
+    cats = parse_payload(payload, "cats")
+    missing = _replace_members(cats, payload, open_cats_index(source).entries, replacements)
+    if missing:
+        names = ", ".join(f"{sub_archive}/{name}" for sub_archive, name in sorted(missing))
+        raise KeyError(f"{names} not found in {os.path.basename(source)}")
+    
+    # stream into a temporary file next to the output, the source stays mapped until it's written
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    try:
+        stats = writeCATS(cats, tmp_path, file_format, profile)
+        del cats
+        try:
+            payload.release()
+        except BufferError:
+            pass
+        os.replace(tmp_path, output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return stats
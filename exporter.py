@@ -1,5 +1,5 @@
 import bpy, bmesh
-import os, time
+import os, re, time
 from time import perf_counter
 from bpy.props import CollectionProperty, StringProperty, BoolProperty
 from bpy.types import Operator, MeshLoopTriangle
@@ -7,10 +7,14 @@ from mathutils import Vector, Quaternion, Matrix, Euler
 from bpy_extras.io_utils import ExportHelper
 from math import radians, tan
 from .reader import readTMD2, writeTMD2, writeTMD, writeLDS
+from .cat_archive import repack_cats
+from .skeleton import bone_data
+from .bone_hashes import bone_hash
 from .tamLib.tmd2 import *
 from .tamLib.tmd import *
 from .tamLib.lds import LDS
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from .panels import TMD2MaterialProperties, TMD2MeshProperties, TMD2MaterialTexture
 import numpy as np
 from math import pi, copysign
@@ -59,6 +63,25 @@ class TMD2_EXPORTER_OT_EXPORT(Operator, ExportHelper):
         default= True,
         description="Apply PZZE/Zlib Compression to models and textures")
 
+    compression_profile: bpy.props.EnumProperty(
+        name="Compression",
+        items=[
+            ('fast', "Fast", "Fastest compression, for iterating on test exports"),
+            ('balanced', "Balanced", "The zlib level tamLib compresses with, same output as previous versions"),
+            ('max', "Max", "Smallest files, for final builds"),
+        ],
+        default='balanced',
+        description="Zlib level used for PZZE compression")
+
+    cat_archive: StringProperty(
+        name="CAT Archive",
+        subtype='FILE_PATH',
+        description="Also replace this model in a .cat archive, the repacked archive is written next to the exported file")
+
+    cat_member: StringProperty(
+        name="CAT Member",
+        description="Name of the mdl.cat member to replace, defaults to the collection name")
+
     def draw(self, context):
         layout = self.layout
         layout.prop_search(self, 'collection', bpy.data, 'collections')
@@ -66,6 +89,13 @@ class TMD2_EXPORTER_OT_EXPORT(Operator, ExportHelper):
         layout.prop(self, "export_textures")
         layout.prop(self, "export_original_bone_data")
         layout.prop(self, "compress_files")
+        row = layout.row()
+        row.enabled = self.compress_files
+        row.prop(self, "compression_profile")
+        layout.prop(self, "cat_archive")
+        row = layout.row()
+        row.enabled = bool(self.cat_archive)
+        row.prop(self, "cat_member")
     
     
     def invoke(self, context, event):
@@ -90,6 +120,7 @@ class TMD2_EXPORTER_OT_EXPORT(Operator, ExportHelper):
         start_time = time.time()
 
         collection = bpy.data.collections[self.collection]
+        self.write_stats = []
         
         if int(self.tmd_version, 16) > 0x201:
             self.tmd = TMD2()
@@ -100,7 +131,15 @@ class TMD2_EXPORTER_OT_EXPORT(Operator, ExportHelper):
             self.tmd.version = int(self.tmd_version, 16)
             self.export_tmd(collection)
         
-        self.report({'INFO'}, f"Export completed in {time.time() - start_time} seconds")
+        size = sum(s["size"] for s in self.write_stats)
+        written = sum(s["written"] for s in self.write_stats)
+        if self.compress_files and size:
+            compress_time = max(s["time"] for s in self.write_stats)
+            self.report({'INFO'}, f"Export completed in {time.time() - start_time:.2f} seconds, "
+                                  f"{size / 1024:.0f} KB compressed to {written / 1024:.0f} KB "
+                                  f"({written / size:.1%}) in {compress_time:.2f} seconds ({self.compression_profile})")
+        else:
+            self.report({'INFO'}, f"Export completed in {time.time() - start_time:.2f} seconds, {written / 1024:.0f} KB written")
         return {'FINISHED'}
     
     
@@ -330,16 +369,28 @@ class TMD2_EXPORTER_OT_EXPORT(Operator, ExportHelper):
         self.tmd.materials = list(materials.values())
         self.tmd.textures = list(textures.values())
 
-        writeTMD2(self.tmd, self.filepath, self.compress_files)
-        
-        #export textures
-        if self.export_textures:
-            tex_path = f"{self.filepath[:-5]}.lds"
+        # serialize and compress the model and the texture archive concurrently, zlib releases the GIL
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            jobs = [pool.submit(writeTMD2, self.tmd, self.filepath, self.compress_files, self.compression_profile)]
             
-            lds = LDS()
-            lds.textures = [tex.data for tex in textures.values()]
+            #export textures
+            if self.export_textures:
+                tex_path = f"{self.filepath[:-5]}.lds"
+                
+                lds = LDS()
+                lds.textures = [tex.data for tex in textures.values()]
+                
+                jobs.append(pool.submit(writeLDS, lds, tex_path, self.compress_files, self.compression_profile))
             
-            writeLDS(lds, tex_path, self.compress_files)
+            for job in jobs:
+                self.write_stats.append(job.result())
+        
+        if self.cat_archive:
+            # untouched members are copied over as they are, only this model is serialized
+            member = self.cat_member or re.sub(r"\.\d{3}$", "", collection.name)
+            cat_path = bpy.path.abspath(self.cat_archive)
+            output = os.path.join(os.path.dirname(self.filepath), os.path.basename(cat_path))
+            self.write_stats.append(repack_cats(cat_path, output, {("mdl.cat", member): self.tmd}, self.compression_profile))
 
     
     
@@ -350,7 +401,7 @@ class TMD2_EXPORTER_OT_EXPORT(Operator, ExportHelper):
         for bone in armature.data.bones:
             tmbone = TMD2Bone()
             tmbone.name = bone.name
-            tmbone.hash = int(bone.get("hash", tamCRC32(bone.name)))
+            tmbone.hash = int(bone["hash"]) if "hash" in bone else bone_hash(bone.name)
             tmbone.matrix = (ZUP_TO_YUP @ bone.matrix_local).inverted().transposed()
             
             
@@ -383,17 +434,18 @@ class TMD2_EXPORTER_OT_EXPORT(Operator, ExportHelper):
         pose_index = 0
         self.tmd.modelFlags |= 0x2000
         bone_indices = {b.name: i for i, b in enumerate(armature.data.bones)}
+        stored = bone_data(armature.data)
         for bone in armature.data.bones:
             tmbone = TMD2Bone()
             tmbone.name = bone.name
-            tmbone.hash = int(bone.get("hash", tamCRC32(bone.name)))
-            tmbone.matrix = Matrix(bone["matrix"]).inverted().transposed()
+            tmbone.hash = int(bone["hash"]) if "hash" in bone else bone_hash(bone.name)
+            tmbone.matrix = stored[bone.name]["matrix"].inverted().transposed()
             
             
             #pose bone
             pbone = armature.pose.bones[bone.name]
-            if bone.get("extra") is not None and bone.get("extra") > -1:
-                tmbone.offset = list(bone["offset"])
+            if stored[bone.name]["extra"] > -1:
+                tmbone.offset = list(stored[bone.name]["offset"])
                 tmbone.extra = pose_index
                 pose_index += 1
             else:
@@ -423,7 +475,7 @@ class TMD2_EXPORTER_OT_EXPORT(Operator, ExportHelper):
         for bone in armature.data.bones:
             tmbone = TMDBone()
             tmbone.name = bone.name
-            tmbone.hash = int(bone.get("hash", tamCRC32(bone.name)))
+            tmbone.hash = int(bone["hash"]) if "hash" in bone else bone_hash(bone.name)
             tmbone.matrix = (ZUP_TO_YUP @ bone.matrix_local).inverted().transposed()
             
             
@@ -456,17 +508,18 @@ class TMD2_EXPORTER_OT_EXPORT(Operator, ExportHelper):
         pose_index = 0
         self.tmd.modelFlags |= 0x2000
         bone_indices = {b.name: i for i, b in enumerate(armature.data.bones)}
+        stored = bone_data(armature.data)
         for bone in armature.data.bones:
             tmbone = TMDBone()
             tmbone.name = bone.name
-            tmbone.hash = int(bone.get("hash", tamCRC32(bone.name)))
-            tmbone.matrix = Matrix(bone["matrix"]).inverted().transposed()
+            tmbone.hash = int(bone["hash"]) if "hash" in bone else bone_hash(bone.name)
+            tmbone.matrix = stored[bone.name]["matrix"].inverted().transposed()
             
             
             #pose bone
             pbone = armature.pose.bones[bone.name]
-            if bone.get("extra") is not None and bone.get("extra") > -1:
-                tmbone.offset = list(bone["offset"])
+            if stored[bone.name]["extra"] > -1:
+                tmbone.offset = list(stored[bone.name]["offset"])
                 tmbone.extra = pose_index
                 pose_index += 1
             else:
@@ -709,7 +762,7 @@ class TMD2_EXPORTER_OT_EXPORT(Operator, ExportHelper):
         self.tmd.materials = list(materials.values())
         self.tmd.textures = list(textures.values())
 
-        writeTMD(self.tmd, self.filepath[:-4] + "tmd")
+        self.write_stats.append(writeTMD(self.tmd, self.filepath[:-4] + "tmd"))
 
 
 
@@ -0,0 +1,98 @@
+import numpy as np
+
+# NumPy helpers shared by the importers, they turn tamLib's arrays into the flat buffers
+# that are handed to foreach_set and bulk vertex group calls. Nothing here touches bpy.
+
+
+# Drop degenerate triangles and repeats of an earlier one in any vertex order, returns (triangles, keep mask)
+def clean_triangles(triangles):
+    triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+    canonical = np.sort(triangles, axis=1)
+    keep = np.zeros(len(triangles), dtype=bool)
+    if len(triangles):
+        _, first = np.unique(canonical, axis=0, return_index=True)
+        keep[first] = True
+    keep &= (canonical[:, 0] != canonical[:, 1]) & (canonical[:, 1] != canonical[:, 2])
+    return triangles[keep], keep
+
+
+# Table index of every mesh vertex and per submesh (mesh vertex of each local vertex, owned mask), welded vertices are owned by the first submesh
+def model_vertex_layout(vertex_indices, weld = False):
+    vertex_indices = [np.asarray(indices, dtype=np.int64).reshape(-1) for indices in vertex_indices]
+    sources = np.concatenate(vertex_indices) if vertex_indices else np.zeros(0, dtype=np.int64)
+    bounds = np.cumsum([0] + [len(indices) for indices in vertex_indices])
+
+    if weld:
+        sources, first, mesh_vertices = np.unique(sources, return_index=True, return_inverse=True)
+        owned = np.zeros(bounds[-1], dtype=bool)
+        owned[first] = True
+    else:
+        mesh_vertices = np.arange(bounds[-1])
+        owned = np.ones(bounds[-1], dtype=bool)
+
+    mesh_vertices = mesh_vertices.reshape(-1).astype(np.int32)
+    submeshes = [(mesh_vertices[start:end], owned[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+    return sources, submeshes
+
+
+# Give welded faces that repeat an earlier face the vertices of their own submesh again, numbered from vertex_count
+def unweld_repeated_faces(triangles, unwelded, vertex_count):
+    triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+    _, keep = clean_triangles(triangles)
+    if keep.all():
+        return triangles, np.zeros(0, dtype=np.int64)
+
+    repeated = ~keep
+    split, new_vertices = np.unique(np.asarray(unwelded).reshape(-1, 3)[repeated], return_inverse=True)
+    triangles = triangles.copy()
+    triangles[repeated] = vertex_count + new_vertices.reshape(-1, 3)
+    return triangles, split.astype(np.int64)
+
+
+# Flatten bone slots into (vertex, group, weight) arrays through the submesh's index table, empty slots are dropped
+def skin_weight_entries(bone_ids, bone_weights, index_table, vertex_ids):
+    ids = np.asarray(bone_ids)
+    if ids.ndim != 2:
+        ids = ids.reshape(len(ids), -1)
+    weights = np.asarray(bone_weights, dtype=np.float32).reshape(ids.shape)
+    table = np.asarray(index_table, dtype=np.int32)
+
+    vertices = np.repeat(np.asarray(vertex_ids, dtype=np.int32), ids.shape[1])
+    used = weights.reshape(-1) > 0
+    groups = table[ids.reshape(-1)[used]]
+    return vertices[used], groups, weights.reshape(-1)[used]
+
+
+# (group, weight, vertex indices) runs for VertexGroup.add, slots of a vertex that point at the same bone are summed
+def skin_weight_runs(vertices, groups, weights):
+    if not len(vertices):
+        return
+
+    # merge repeated (group, vertex) pairs
+    order = np.lexsort((vertices, groups))
+    vertices, groups, weights = vertices[order], groups[order], weights[order]
+    starts = np.flatnonzero(np.r_[True, (groups[1:] != groups[:-1]) | (vertices[1:] != vertices[:-1])])
+    vertices, groups = vertices[starts], groups[starts]
+    weights = np.add.reduceat(weights, starts)
+
+    # then split every group by distinct weight
+    order = np.lexsort((vertices, weights, groups))
+    vertices, groups, weights = vertices[order], groups[order], weights[order]
+    starts = np.flatnonzero(np.r_[True, (groups[1:] != groups[:-1]) | (weights[1:] != weights[:-1])])
+    ends = np.r_[starts[1:], len(vertices)]
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        yield int(groups[start]), float(weights[start]), vertices[start:end].tolist()
+
+
+# Blender is Z-up, Tamsoft models are Y-up (same as Matrix.Rotation(radians(90), 4, 'X'))
+YUP_TO_ZUP = np.array(((1, 0, 0, 0),
+                       (0, 0, -1, 0),
+                       (0, 1, 0, 0),
+                       (0, 0, 0, 1)), dtype=np.float64)
+
+
+# (bind, armature space) matrices of a bone table, a bind matrix is the inverse of the transposed stored one
+def bone_bind_matrices(bone_matrices):
+    matrices = np.asarray(bone_matrices, dtype=np.float64).reshape(-1, 4, 4)
+    bind = np.linalg.inv(matrices.transpose(0, 2, 1))
+    return bind, YUP_TO_ZUP @ bind
@@ -1,5 +1,5 @@
 import bpy, bmesh, math, mathutils
-from mathutils import Vector, Quaternion, Matrix, Euler
+from mathutils import Vector, Matrix, Euler
 from math import radians
 from bpy_extras.io_utils import ImportHelper
 from bpy.props import StringProperty, BoolProperty, IntProperty, CollectionProperty
@@ -14,9 +14,93 @@ import numpy as np
 from .materials.shaders import shaders_dict
 from collections import defaultdict
 from time import perf_counter
-import json
 from cProfile import Profile
-hashes = json.load(open(os.path.join(os.path.dirname(__file__), "hashes.json")))
+from .asset_index import update_index, query_files, default_index_path
+from .cat_archive import open_cats_index
+from .workers import pipeline
+from .transport import attach
+from .skeleton import ArmatureBatch
+from .geometry import clean_triangles, model_vertex_layout, unweld_repeated_faces, skin_weight_entries, skin_weight_runs
+from .bone_hashes import bone_name, bone_hash
+
+_directory_listings = {}
+
+# File names in a directory, cached until the directory is modified
+def list_directory(directory):
+    mtime = os.stat(directory).st_mtime_ns
+    cached = _directory_listings.get(directory)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, os.listdir(directory))
+        _directory_listings[directory] = cached
+    return cached[1]
+
+
+def find_lds_files(directory):
+    lds_files = {}
+    for file in list_directory(directory):
+        if file.lower().endswith(".lds"):
+            base_name, _ = os.path.splitext(file.lower())
+            lds_files[base_name] = os.path.join(directory, file)
+    return lds_files
+
+
+def find_dds_files(directory):
+    dds_files = {}
+    hashed_names = {}
+    for file in list_directory(directory):
+        if file.lower().endswith(".dds"):
+            base_name, _ = os.path.splitext(file)
+            hashed_name = tamCRC32(base_name)
+            dds_files[base_name] = os.path.join(directory, file)
+            hashed_names[hashed_name] = base_name
+    return dds_files, hashed_names
+
+# Pair each TMD2 with the LDS of the same name
+def tmd2_import_jobs(directory, file_names):
+    lds_files = find_lds_files(directory)
+    
+    jobs = []
+    for file_name in file_names:
+        tmd2_path = os.path.join(directory, file_name)
+        base_name, _ = os.path.splitext(file_name.lower())
+
+        # Try to find matching LDS
+        texture_path = ""
+        if base_name in lds_files:
+            texture_path = lds_files[base_name]
+            print(f"✅ Using matching LDS file for {base_name}: {texture_path}")
+        else:
+            fallback = os.path.join(directory, base_name + ".lds")
+            if os.path.exists(fallback):
+                texture_path = fallback
+                print(f"📁 Found fallback LDS file for {base_name}: {texture_path}")
+            else:
+                print(f"❌ No LDS found for {base_name}, importing TMD2 without texture.")
+
+        jobs.append((tmd2_path, texture_path))
+    return jobs
+
+
+# Build the Blender data of one pipeline result, then release its shared memory
+def build_tmd2(operator, context, settings, tmd2_path, texture_path, result, armatures = None):
+    (tmd2, lds), block = result
+    with block:
+        importer = importTMD2(operator, tmd2_path, settings, tmd2, {})
+        importer.texture_path = texture_path
+        importer.lds = lds
+        importer.read(context, armatures)
+
+
+# Workers parse the next files while this thread builds the current one, only this thread touches bpy
+def import_tmd2_files(operator, context, jobs):
+    settings = operator.as_keywords(ignore=("filter_glob",))
+    with ArmatureBatch(context) as armatures, pipeline(readTMD2WithTextures, jobs, receive=attach) as results:
+        for (tmd2_path, texture_path), result, error in results:
+            if error is not None:
+                operator.report({'WARNING'}, f"Failed to read {os.path.basename(tmd2_path)}: {error}")
+                continue
+            build_tmd2(operator, context, settings, tmd2_path, texture_path, result, armatures)
+
 
 class TMD2_IMPORTER_OT_IMPORT(Operator, ImportHelper):
     bl_label = "Import TMD2"
@@ -30,6 +114,8 @@ class TMD2_IMPORTER_OT_IMPORT(Operator, ImportHelper):
     filepath: StringProperty(subtype='FILE_PATH') # type: ignore
     auto_find_textures: BoolProperty(default=True) # type: ignore
     texture_path: StringProperty(subtype='FILE_PATH') # type: ignore
+    weld_vertices: BoolProperty(name="Weld Submeshes", default=False, description="Share vertices between submeshes that use the same model vertex instead of splitting them at material seams, faces repeated by another submesh keep their own vertices") # type: ignore
+    reuse_armature: BoolProperty(name="Reuse Matching Armature", default=False, description="Bind the meshes to an armature already in the scene that was built from the same skeleton instead of creating a new one") # type: ignore
 
     def execute(self, context):
         # Split files by type
@@ -54,6 +140,7 @@ class TMD2_IMPORTER_OT_IMPORT(Operator, ImportHelper):
 
 
         if tmd2_files:
+            jobs = []
             for base_name, tmd2_path in tmd2_files.items():
                 texture_path = ""
 
@@ -71,26 +158,15 @@ class TMD2_IMPORTER_OT_IMPORT(Operator, ImportHelper):
                     else:
                         print(f"❌ No LDS found for {base_name}, importing TMD2 without texture.")
 
-                # Read and import TMD2
-                tmd2 = readTMD2(tmd2_path)
-                importer = importTMD2(self, tmd2_path, self.as_keywords(ignore=("filter_glob",)), tmd2, {})
-
-                # Store texture path for later use
-                importer.texture_path = texture_path
-
-                importer.read(context)
+                jobs.append((tmd2_path, texture_path))
+            
+            # Read in worker processes and import here as each file becomes ready
+            import_tmd2_files(self, context, jobs)
         
         
         if tmd_files:
             # Collect DDS files
-            dds_files = {}
-            hashed_names = {}
-            for file in os.listdir(self.directory):
-                if file.lower().endswith(".dds"):
-                    base_name, _ = os.path.splitext(file)
-                    hashed_name = tamCRC32(base_name)
-                    dds_files[base_name] = os.path.join(self.directory, file)
-                    hashed_names[hashed_name] = base_name
+            dds_files, hashed_names = find_dds_files(self.directory)
 
             # Import TMD files
         
@@ -108,6 +184,8 @@ class TMD2_IMPORTER_OT_IMPORT(Operator, ImportHelper):
     def draw(self, context):
         layout = self.layout
         layout.prop(self, "auto_find_textures", text= "Auto Find Textures")
+        layout.prop(self, "weld_vertices")
+        layout.prop(self, "reuse_armature")
         #layout.prop(self, "texture_path", text= "Texture Path")
 
 
@@ -121,47 +199,30 @@ class DropTMD2(Operator):
     filter_glob: StringProperty(default="*.tmd2", options={"HIDDEN"}) # type: ignore
     filename_ext = ".tmd2"
     filepath: StringProperty(subtype='FILE_PATH') # type: ignore
+    weld_vertices: BoolProperty(name="Weld Submeshes", default=False, description="Share vertices between submeshes that use the same model vertex instead of splitting them at material seams, faces repeated by another submesh keep their own vertices") # type: ignore
+    reuse_armature: BoolProperty(name="Reuse Matching Armature", default=False, description="Bind the meshes to an armature already in the scene that was built from the same skeleton instead of creating a new one") # type: ignore
 
     def execute(self, context):
-        # Collect LDS files
-        lds_files = {}
-        for file in os.listdir(self.directory):
-            if file.lower().endswith(".lds"):
-                base_name, _ = os.path.splitext(file.lower())
-                lds_files[base_name] = os.path.join(self.directory, file)
-
-
+        # Multi-file drops go through the modal batch operator so Blender stays responsive
+        if len(self.files) > 1:
+            bpy.ops.import_scene.tmd2_batch('INVOKE_DEFAULT', directory=self.directory,
+                                            files=[{"name": file.name} for file in self.files],
+                                            weld_vertices=self.weld_vertices,
+                                            reuse_armature=self.reuse_armature)
+            return {'FINISHED'}
+        
         start_time = perf_counter()
 
-        for file in self.files:
-            tmd2_path = os.path.join(self.directory, file.name)
-            base_name, _ = os.path.splitext(file.name.lower())
-
-            # Try to find matching LDS
-            texture_path = ""
-            if base_name in lds_files:
-                texture_path = lds_files[base_name]
-                print(f"✅ Using matching LDS file for {base_name}: {texture_path}")
-            else:
-                fallback = os.path.join(self.directory, base_name + ".lds")
-                if os.path.exists(fallback):
-                    texture_path = fallback
-                    print(f"📁 Found fallback LDS file for {base_name}: {texture_path}")
-                else:
-                    print(f"❌ No LDS found for {base_name}, importing TMD2 without texture.")
-
-            # Import TMD2
-            #prfl = Profile()
-            #prfl.enable()
+        jobs = tmd2_import_jobs(self.directory, [file.name for file in self.files])
 
-            tmd2 = readTMD2(tmd2_path)
+        # Import TMD2
+        #prfl = Profile()
+        #prfl.enable()
 
-            #prfl.disable()
-            #prfl.print_stats(sort="cumtime")
+        import_tmd2_files(self, context, jobs)
 
-            importer = importTMD2(self, tmd2_path, self.as_keywords(ignore=("filter_glob",)), tmd2, {})
-            importer.texture_path = texture_path
-            importer.read(context)
+        #prfl.disable()
+        #prfl.print_stats(sort="cumtime")
             
         end_time = perf_counter()
         elapsed_time = end_time - start_time
@@ -170,6 +231,107 @@ class DropTMD2(Operator):
         return {'FINISHED'}
 
 
+class TMD2_OT_BatchImport(Operator):
+    """Import many TMD2 files one at a time without freezing Blender, press Esc to stop"""
+    bl_idname = "import_scene.tmd2_batch"
+    bl_label = "Batch Import TMD2"
+
+    files: CollectionProperty(type=bpy.types.OperatorFileListElement, options={'HIDDEN', 'SKIP_SAVE'}) # type: ignore
+    directory: StringProperty(subtype='DIR_PATH', options={'HIDDEN', 'SKIP_SAVE'}) # type: ignore
+    filter_glob: StringProperty(default="*.tmd2", options={"HIDDEN"}) # type: ignore
+    weld_vertices: BoolProperty(name="Weld Submeshes", default=False, description="Share vertices between submeshes that use the same model vertex instead of splitting them at material seams, faces repeated by another submesh keep their own vertices") # type: ignore
+    reuse_armature: BoolProperty(name="Reuse Matching Armature", default=False, description="Bind the meshes to an armature already in the scene that was built from the same skeleton instead of creating a new one") # type: ignore
+
+    def execute(self, context):
+        import_tmd2_files(self, context, tmd2_import_jobs(self.directory, [file.name for file in self.files]))
+        return {'FINISHED'}
+    
+    
+    def invoke(self, context, event):
+        self.jobs = tmd2_import_jobs(self.directory, [file.name for file in self.files])
+        if not self.jobs:
+            return {'CANCELLED'}
+        
+        # files are parsed ahead in worker processes, each timer tick builds one of them
+        self.results = pipeline(readTMD2WithTextures, self.jobs, receive=attach)
+        self.armatures = ArmatureBatch(context)
+        self.settings = self.as_keywords(ignore=("filter_glob",))
+        self.imported = 0
+        self.failed = []
+        self.start_time = perf_counter()
+        
+        wm = context.window_manager
+        wm.progress_begin(0, len(self.jobs))
+        self.timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        self.set_status(context, f"Importing {len(self.jobs)} TMD2 files, press Esc to cancel")
+        return {'RUNNING_MODAL'}
+    
+    
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self.finish(context, cancelled=True)
+        # only take a result once it's parsed, waiting for it would block Blender and Esc
+        if event.type != 'TIMER' or not self.results.ready():
+            return {'PASS_THROUGH'}
+        
+        try:
+            (tmd2_path, texture_path), result, error = next(self.results)
+        except StopIteration:
+            return self.finish(context)
+        except Exception as e:
+            # e.g. a worker process died, the remaining files can't be parsed
+            self.report({'ERROR'}, f"Import stopped: {e}")
+            return self.finish(context, cancelled=True)
+        
+        name = os.path.basename(tmd2_path)
+        done = self.imported + len(self.failed) + 1
+        if error is None:
+            try:
+                build_tmd2(self, context, self.settings, tmd2_path, texture_path, result, self.armatures)
+            except Exception as e:
+                error = e
+            del result
+        
+        if error is None:
+            self.imported += 1
+            self.report({'INFO'}, f"[{done}/{len(self.jobs)}] Imported {name}")
+        else:
+            self.failed.append(name)
+            self.report({'WARNING'}, f"[{done}/{len(self.jobs)}] Failed to import {name}: {error}")
+        
+        context.window_manager.progress_update(done)
+        self.set_status(context, f"Imported {name} ({done}/{len(self.jobs)}), press Esc to cancel")
+        return {'RUNNING_MODAL'}
+    
+    
+    def set_status(self, context, text):
+        if context.workspace:
+            context.workspace.status_text_set(text)
+    
+    
+    def finish(self, context, cancelled = False):
+        # closing the pipeline cancels the files that haven't been parsed yet
+        self.results.close()
+        self.armatures.flush()
+        
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        self.set_status(context, None)
+        
+        summary = f"Imported {self.imported} of {len(self.jobs)} TMD2 files in {perf_counter() - self.start_time:.2f} seconds"
+        if self.failed:
+            summary += f", {len(self.failed)} failed: {', '.join(self.failed)}"
+        if cancelled:
+            self.report({'WARNING'}, f"Import cancelled. {summary}.")
+        else:
+            self.report({'INFO'}, f"{summary}.")
+        
+        # the files imported before a cancel are kept
+        return {'FINISHED'}
+
+
 class TMD2_FH_import(bpy.types.FileHandler):
     bl_idname = "TMD2_FH_import"
     bl_label = "File handler for TMD2 files"
@@ -197,15 +359,7 @@ class DropTMD(Operator):
 
     def execute(self, context):
         # Collect DDS files
-        dds_files = {}
-        hashed_names = {}
-        for file in os.listdir(self.directory):
-            if file.lower().endswith(".dds"):
-                base_name, _ = os.path.splitext(file)
-                hashed_name = tamCRC32(base_name)
-                dds_files[base_name] = os.path.join(self.directory, file)
-                hashed_names[hashed_name] = base_name
-        
+        dds_files, hashed_names = find_dds_files(self.directory)
 
         for file in self.files:
             tmd_path = os.path.join(self.directory, file.name)
@@ -274,24 +428,21 @@ class DropCAT(Operator):
     filter_glob: StringProperty(default="*.tmd2", options={"HIDDEN"}) # type: ignore
     filename_ext = ".cat"
     filepath: StringProperty(subtype='FILE_PATH') # type: ignore
+    member_filter: StringProperty(default="*", description="Only import mdl.cat members whose name matches this pattern") # type: ignore
     def execute(self, context):
         for file in self.files:
             self.filepath = os.path.join(self.directory, file.name)
 
-            # Read and import CAT
-            cat = readCATS(self.filepath)
-            for c in cat.subCATS:
-                if c.name == "mdl.cat":
-                    for i in range(c.catCount):
-                        mdl = c.subData[i]
-                        name = c.subNames[i]
-                        # Read and import TMD2
-                        br = BinaryReader(mdl, Endian.LITTLE)
-                        tmd2 = br.read_struct(TMD2)
-                        print(name)
-                        tmd2.name = name
-                        importer = importTMD2(self, self.filepath, self.as_keywords(ignore=("filter_glob",)), tmd2, {})
-                        importer.read(context)
+            # Index the CAT, only the matching members are extracted and parsed
+            index = open_cats_index(self.filepath)
+            names = [name for _, name, _, _ in index.members("mdl.cat", self.member_filter)]
+            
+            # members are parsed in worker processes, this thread only builds the Blender data
+            with ArmatureBatch(context) as armatures:
+                for name, tmd2 in index.parse_many(names, "mdl.cat"):
+                    print(name)
+                    importer = importTMD2(self, self.filepath, self.as_keywords(ignore=("filter_glob", "member_filter")), tmd2, {})
+                    importer.read(context, armatures)
         
         return {'FINISHED'}
 
@@ -344,6 +495,62 @@ class TMO_FH_import(bpy.types.FileHandler):
         pass
 
 
+class TMD2_OT_UpdateIndex(Operator):
+    """Scan a game directory and update its searchable asset index"""
+    bl_idname = "import_scene.tmd2_update_index"
+    bl_label = "Update TMD2 Asset Index"
+
+    def execute(self, context):
+        props = context.scene.tmd2_index
+        root = bpy.path.abspath(props.directory)
+        if not os.path.isdir(root):
+            self.report({'ERROR'}, "Choose a directory to index first.")
+            return {'CANCELLED'}
+        
+        start_time = perf_counter()
+        probed, removed = update_index(default_index_path(root), root)
+        
+        self.report({'INFO'}, f"Indexed {probed} new or changed files, removed {removed} in {perf_counter() - start_time:.2f} seconds.")
+        return {'FINISHED'}
+
+
+class TMD2_OT_ImportFromIndex(Operator):
+    """Import the indexed TMD2 files that match the search fields"""
+    bl_idname = "import_scene.tmd2_from_index"
+    bl_label = "Import Matching TMD2 Files"
+
+    def execute(self, context):
+        props = context.scene.tmd2_index
+        root = bpy.path.abspath(props.directory)
+        db_path = default_index_path(root)
+        if not os.path.exists(db_path):
+            self.report({'ERROR'}, "No index found for this directory, update it first.")
+            return {'CANCELLED'}
+        
+        paths = query_files(db_path, props.bone.strip(), props.shader.strip(), props.texture.strip(),
+                            props.model.strip(), "tmd2")
+        if not paths:
+            self.report({'WARNING'}, "No indexed files match the search.")
+            return {'CANCELLED'}
+        
+        if len(paths) > props.max_results:
+            self.report({'WARNING'}, f"{len(paths)} files match, only the first {props.max_results} were imported.")
+            paths = paths[:props.max_results]
+        
+        with ArmatureBatch(context) as armatures:
+            for tmd2_path in paths:
+                directory = os.path.dirname(tmd2_path)
+                base_name, _ = os.path.splitext(os.path.basename(tmd2_path).lower())
+                
+                tmd2 = readTMD2(tmd2_path)
+                importer = importTMD2(self, tmd2_path, self.as_keywords(), tmd2, {})
+                importer.texture_path = find_lds_files(directory).get(base_name, "")
+                importer.read(context, armatures)
+        
+        self.report({'INFO'}, f"Imported {len(paths)} TMD2 files.")
+        return {'FINISHED'}
+
+
 class importTMO:
     def __init__(self, operator: Operator, filepath, import_settings: dict, tmofile):
         self.operator = operator
@@ -386,7 +593,7 @@ class importTMO:
             if "hash" in bone.keys():
                 bone_hashes[bone["hash"]] = bone.name
             else:
-                bone_hashes[tamCRC32(bone.name)] = bone.name
+                bone_hashes[str(bone_hash(bone.name))] = bone.name
             
         
         # loop over bones, get their hash and find the corresponding bone in the armature
@@ -430,11 +637,27 @@ class importTMO:
                 
 
 
+# flag, vertex field, layer name
+tmd2_uv_layers = (
+    (0x10, "uv", "UVMap"),
+    (0x20, "uv2", "UVMap1"),
+    (0x40, "uv3", "UVMap2"),
+)
+
+tmd2_color_layers = (
+    (0x80, "color", "Color"),
+    (0x200, "color2", "Color2"),
+)
+
+
 class importTMD2:
     def __init__(self, operator: Operator, filepath, import_settings: dict, tmd2file, dds_paths = {}):
         self.operator = operator
         self.filepath = filepath
         self.texture_path = ""
+        self.lds = None
+        self.weld_vertices = False
+        self.reuse_armature = False
         for key, value in import_settings.items():
             setattr(self, key, value)
         
@@ -442,7 +665,8 @@ class importTMD2:
         self.dds_paths = dds_paths
     
     
-    def read(self, context):
+    # Queue the armature on armatures (an ArmatureBatch) when given, otherwise the bones are built right away
+    def read(self, context, armatures = None):
         collection = bpy.data.collections.new(f"{self.tmd2.name}")
         context.collection.children.link(collection)
         
@@ -457,7 +681,7 @@ class importTMD2:
         
         #import and process materials and textures
         if self.texture_path:
-            lds = importLDS(self.texture_path, True) 
+            lds = importLDS(self.texture_path, True, self.lds)
             images_list = lds.images
         elif self.dds_paths:
             #load dds files using the same name in the tmd file
@@ -529,64 +753,25 @@ class importTMD2:
         # Create a new mesh
         YUP_TO_ZUP = Matrix.Rotation(radians(90), 4, 'X')        
         
-        bones_to_pose = {}
+        # bones are built later with the rest of the batch, meshes only need their names
+        batch = armatures or ArmatureBatch(context)
+        bone_names = []
         
         if self.tmd2.modelFlags & 0x2000:
             #skeleton data
-            armature = bpy.data.armatures.new(self.tmd2.name)
-            armature_obj = bpy.data.objects.new(self.tmd2.name, armature)
-            collection.objects.link(armature_obj)
-            bpy.context.view_layer.objects.active = armature_obj
-            bpy.ops.object.mode_set(mode='EDIT')
-            
-            armature_obj.data.display_type = 'STICK'
-            
-            for tmbone in self.tmd2.bones:
-                tmbone: TMD2Bone
-                
-                if str(tmbone.hash) in hashes:
-                    tmbone.name = hashes[str(tmbone.hash)]
-                bbone = armature_obj.data.edit_bones.new(tmbone.name)
-                
-                matrix = Matrix(tmbone.matrix).transposed().inverted()
-                matrix_up = YUP_TO_ZUP @ matrix
-                
-                bbone.matrix = matrix_up
-                bbone.tail += Vector((0, 0, 0.01)) # Set the tail position to be 1 unit along the Z axis
-                
-                #set parent
-                if tmbone.parentIndex != -1:
-                    parent_bone = armature_obj.data.edit_bones[tmbone.parentIndex]
-                    bbone.parent = parent_bone
-                
-                if tmbone.extra > -1:
-                    bones_to_pose[bbone.name] =  tmbone.offset
+            match = batch.find(self.tmd2.bones) if self.reuse_armature else None
+            if match:
+                # same skeleton as an armature in the scene, bind the meshes to that one
+                armature_obj, bone_names = match
+                armature = armature_obj.data
+                collection.objects.link(armature_obj)
+            else:
+                armature = bpy.data.armatures.new(self.tmd2.name)
+                armature_obj = bpy.data.objects.new(self.tmd2.name, armature)
+                collection.objects.link(armature_obj)
                 
-                #set custom props
-                bbone["hash"] = str(tmbone.hash)
-                bbone["extra"] = tmbone.extra
-                bbone["offset"] = tmbone.offset
-                bbone["posed_loc"] = tmbone.posedLocation
-                bbone["unk1"] = tmbone.unk1
-                bbone["matrix"] = matrix
-                bbone["matrix_up"] = matrix_up
-            
-            bpy.ops.object.mode_set(mode='OBJECT')
-            
-            #pose the armature
-            if armature and bones_to_pose:
-                #rotate bones
-                for bname, rotation in bones_to_pose.items():
-                    p = armature_obj.pose.bones[bname]
-                    if not p.parent:
-                        continue
-
-                    axes = p.bone.matrix_local.to_3x3().transposed()
-                    space = p.parent.matrix.to_3x3()
-                    x, y, z = (space @ v for v in axes)
-
-                    p.rotation_mode = 'QUATERNION'
-                    p.rotation_quaternion = Quaternion(z, rotation[2]) @ Quaternion(y, rotation[1]) @ Quaternion(x, rotation[0])
+                names = [bone_name(tmbone.hash, tmbone.name) for tmbone in self.tmd2.bones]
+                bone_names = batch.add(armature_obj, self.tmd2.bones, names)
         
         
         for tmd_model in self.tmd2.models:
@@ -613,142 +798,117 @@ class importTMD2:
                 model_mats[mesh_mat] = i
             
 
-            # Create a new bmesh object
-            bm = bmesh.new()
-
-            # Create vertices
-            custom_normals = []
-            vgroups_count = 0
             if self.tmd2.modelFlags & 0x400:
-                vgroup_layer = bm.verts.layers.deform.new("Weights")
-                vgroups_count = 4
-                
-                for bone in armature.bones:
-                    mesh_obj.vertex_groups.new(name = bone.name)
-                
                 #add arnature modifier
                 armature_modifier = mesh_obj.modifiers.new(name = armature.name, type = 'ARMATURE')
                 armature_modifier.object = armature_obj
                 
                 mesh_obj.parent = armature_obj
-                
-                if self.tmd2.modelFlags & 0x8000:
-                    vgroups_count += 4
             
-            uv_layers = []
-            if self.tmd2.modelFlags & 0x10:
-                uv0_layer = bm.loops.layers.uv.new(f"UVMap")
-                uv_layers.append(uv0_layer)
+            # With welding, submeshes share one mesh vertex per vertex of the model's table
+            vertices = self.tmd2.vertices
+            submesh_indices = [np.asarray(tmd_mesh.vertexIndices).reshape(-1) for tmd_mesh in tmd_model.meshes]
+            vertex_sources, submesh_vertices = model_vertex_layout(submesh_indices, self.weld_vertices)
             
-            if self.tmd2.modelFlags & 0x20:
-                uv1_layer = bm.loops.layers.uv.new(f"UVMap1")
-                uv_layers.append(uv1_layer)
+            # Clean up each submesh's triangles first so every buffer can be sized up front
+            submesh_tris = []
+            face_count = 0
+            for tmd_mesh in tmd_model.meshes:
+                tmd_mesh: TMD2Submesh
+                
+                # degenerate and repeated faces are dropped before anything is built from them
+                tris, _ = clean_triangles(tmd_mesh.triangles)
+                submesh_tris.append((tris, face_count))
+                face_count += len(tris)
             
-            if self.tmd2.modelFlags & 0x40:
-                uv2_layer = bm.loops.layers.uv.new(f"UVMap2")
-                uv_layers.append(uv2_layer)
+            triangles = np.empty((face_count, 3), dtype=np.int32)
+            for (tris, face_offset), (mesh_vertex_ids, _) in zip(submesh_tris, submesh_vertices):
+                np.take(mesh_vertex_ids, tris, out=triangles[face_offset:face_offset + len(tris)])
             
-            color_layers = []
-            if self.tmd2.modelFlags & 0x80:
-                col1_layer = bm.loops.layers.color.new(f"Color")
-                color_layers.append(col1_layer)
+            # welded submeshes can repeat each other's faces (e.g. an overlay with a second material),
+            # those keep vertices of their own so the exporter still splits them into their submesh
+            vertex_starts = np.cumsum([0] + [len(indices) for indices in submesh_indices])
+            split_vertices = np.zeros(0, dtype=np.int64)
+            if self.weld_vertices and face_count:
+                unwelded = np.concatenate([tris + start for (tris, _), start in zip(submesh_tris, vertex_starts)])
+                triangles, split_vertices = unweld_repeated_faces(triangles, unwelded, len(vertex_sources))
+                if len(split_vertices):
+                    vertex_sources = np.concatenate([vertex_sources, np.concatenate(submesh_indices)[split_vertices]])
+            welded_count = len(vertex_sources) - len(split_vertices)
+            vertex_count = len(vertex_sources)
             
-            if self.tmd2.modelFlags & 0x200:
-                col2_layer = bm.loops.layers.color.new(f"Color2")
-                color_layers.append(col2_layer)
+            # One float32 buffer per layer, filled in place and written once
+            loop_count = face_count * 3
+            positions = np.ascontiguousarray(vertices["position"][vertex_sources, :3], dtype=np.float32)
+            normals = np.ascontiguousarray(vertices["normal"][vertex_sources, :3], dtype=np.float32)
+            material_indices = np.empty(face_count, dtype=np.int32)
             
-            uv0_list = []
-            uv1_list = []
-            uv2_list = []
-            color1_list = []
-            color2_list = []
+            corner_data = {}
+            for flag, field, name in tmd2_uv_layers + tmd2_color_layers:
+                if self.tmd2.modelFlags & flag:
+                    corner_data[name] = (field, np.empty((loop_count, *vertices.dtype[field].shape), dtype=np.float32))
             
-            for tmd_mesh in tmd_model.meshes:
-                tmd_mesh: TMD2Submesh
+            skin = []
+            for tmd_mesh, vertex_indices, vertex_start, (tris, face_offset), (mesh_vertex_ids, owned) in zip(
+                    tmd_model.meshes, submesh_indices, vertex_starts, submesh_tris, submesh_vertices):
+                face_end = face_offset + len(tris)
                 
-                mesh_vertices = self.tmd2.vertices[tmd_mesh.vertexIndices]
-                
-                bm_verts = []
-                if self.tmd2.modelFlags & 0x8000:
-                    bone_ids = np.concatenate([mesh_vertices["boneIDs"], mesh_vertices["boneIDs2"]], axis=1)
-                    bone_weights = np.concatenate([mesh_vertices["boneWeights"], mesh_vertices["boneWeights2"]], axis=1)
-                else:
-                    bone_ids = mesh_vertices["boneIDs"]
-                    bone_weights = mesh_vertices["boneWeights"]
-                
-                
-                bm_verts = [bm.verts.new(vertex["position"]) for vertex in mesh_vertices]
+                material_indices[face_offset:face_end] = model_mats[tmd_mesh.material]
                 
+                corner_vertices = vertex_indices[tris.reshape(-1)]
+                for field, buffer in corner_data.values():
+                    buffer[face_offset * 3:face_end * 3] = vertices[field][corner_vertices]
                 
+                # a welded vertex takes its weights from the first submesh that uses it, split ones from their own
                 if self.tmd2.modelFlags & 0x400:
-                    for i, v in enumerate(bm_verts):
-                        for boneID, weight in zip(bone_ids[i], bone_weights[i]):
-                            v[vgroup_layer][tmd_mesh.indexTable[boneID]] = weight
-                
-                bm.verts.ensure_lookup_table()
-
-                for tri in tmd_mesh.triangles:
-                    try:
-                        face = bm.faces.new([bm_verts[i] for i in tri])
-                        face.smooth = True
-                        face.material_index = model_mats[tmd_mesh.material]
-                    except ValueError:
-                        # face exists already, skip
-                        pass
-                
-                custom_normals.extend(self.tmd2.vertices[tmd_mesh.vertexIndices]["normal"][:, :3].tolist())
-                
-                if self.tmd2.modelFlags & 0x10:
-                    # 1. UV0
-                    uvs = mesh_vertices["uv"]
-                    uv_flat = uvs[tmd_mesh.triangles]
-                    uv_flat[..., 1] = 1.0 - uv_flat[..., 1]
-                    uv0_list.extend(uv_flat.flatten())
-                if self.tmd2.modelFlags & 0x20:
-                    # 2. UV1
-                    uvs = mesh_vertices["uv2"]
-                    uv_flat = uvs[tmd_mesh.triangles]
-                    uv_flat[..., 1] = 1.0 - uv_flat[..., 1]
-                    uv1_list.extend(uv_flat.flatten())
-                if self.tmd2.modelFlags & 0x40:
-                    # 3. UV2
-                    uvs = mesh_vertices["uv3"]
-                    uv_flat = uvs[tmd_mesh.triangles]
-                    uv_flat[..., 1] = 1.0 - uv_flat[..., 1]
-                    uv2_list.extend(uv_flat.flatten())
-                if self.tmd2.modelFlags & 0x80:
-                    # 4. Color1
-                    colors = mesh_vertices["color"]
-                    color_flat = colors[tmd_mesh.triangles]
-                    color1_list.extend(color_flat.flatten())
-                if self.tmd2.modelFlags & 0x200:
-                    # 5. Color2
-                    colors = mesh_vertices["color2"]
-                    color_flat = colors[tmd_mesh.triangles]
-                    color2_list.extend(color_flat.flatten())
-                    
-                
-            bm.to_mesh(mesh)
-            bm.free()
+                    split = np.flatnonzero((split_vertices >= vertex_start) & (split_vertices < vertex_start + len(vertex_indices)))
+                    skinned = vertices[np.concatenate([vertex_indices[owned], vertex_indices[split_vertices[split] - vertex_start]])]
+                    skinned_ids = np.concatenate([mesh_vertex_ids[owned], welded_count + split])
+                    if self.tmd2.modelFlags & 0x8000:
+                        bone_ids = np.concatenate([skinned["boneIDs"], skinned["boneIDs2"]], axis=1)
+                        bone_weights = np.concatenate([skinned["boneWeights"], skinned["boneWeights2"]], axis=1)
+                    else:
+                        bone_ids = skinned["boneIDs"]
+                        bone_weights = skinned["boneWeights"]
+                    skin.append(skin_weight_entries(bone_ids, bone_weights, tmd_mesh.indexTable, skinned_ids))
+            
+            mesh.vertices.add(vertex_count)
+            mesh.vertices.foreach_set("co", positions.reshape(-1))
+            
+            mesh.loops.add(loop_count)
+            mesh.loops.foreach_set("vertex_index", triangles.reshape(-1))
+            
+            mesh.polygons.add(face_count)
+            mesh.polygons.foreach_set("loop_start", np.arange(0, face_count * 3, 3, dtype=np.int32))
+            if not bpy.types.MeshPolygon.bl_rna.properties["loop_total"].is_readonly:
+                mesh.polygons.foreach_set("loop_total", np.full(face_count, 3, dtype=np.int32))
+            mesh.polygons.foreach_set("material_index", material_indices)
+            mesh.polygons.foreach_set("use_smooth", np.ones(face_count, dtype=bool))
+            
+            mesh.update(calc_edges=True)
+            
+            for _, _, name in tmd2_uv_layers:
+                if name in corner_data:
+                    uvs = corner_data[name][1]
+                    uvs[:, 1] = 1.0 - uvs[:, 1]
+                    mesh.uv_layers.new(name=name).data.foreach_set("uv", uvs.reshape(-1))
+            
+            for _, _, name in tmd2_color_layers:
+                if name in corner_data:
+                    mesh.vertex_colors.new(name=name).data.foreach_set("color", corner_data[name][1].reshape(-1))
+            
             if self.tmd2.modelFlags & 0x4:
-                mesh.normals_split_custom_set_from_vertices(custom_normals)
+                mesh.normals_split_custom_set_from_vertices(normals)
+            
+            if skin:
+                # one add call per bone and weight, groups are only made for bones that are used
+                vertex_groups = {}
+                entries = (np.concatenate(column) for column in zip(*skin))
+                for group, weight, vertex_indices in skin_weight_runs(*entries):
+                    if group not in vertex_groups:
+                        vertex_groups[group] = mesh_obj.vertex_groups.new(name = bone_names[group])
+                    vertex_groups[group].add(vertex_indices, weight, 'REPLACE')
             
-            if uv0_list:
-                uv0_layer = mesh.uv_layers[0]
-                uv0_layer.data.foreach_set("uv", uv0_list)
-                
-            if uv1_list:
-                uv1_layer = mesh.uv_layers[1]
-                uv1_layer.data.foreach_set("uv", uv1_list)
-            if uv2_list:
-                uv2_layer = mesh.uv_layers[2]
-                uv2_layer.data.foreach_set("uv", uv2_list)
-            if color1_list:
-                col1_layer = mesh.vertex_colors[0]
-                col1_layer.data.foreach_set("color", color1_list)
-            if color2_list:
-                col2_layer = mesh.vertex_colors[1]
-                col2_layer.data.foreach_set("color", color2_list)
             mesh.update()
             #set active color
             mesh.color_attributes.render_color_index = 0
@@ -756,7 +916,9 @@ class importTMD2:
             
                 
             mesh.transform(YUP_TO_ZUP)
-            
+        
+        if armatures is None:
+            batch.flush()
 
 
 
@@ -860,8 +1022,7 @@ class importTMD:
             for tmbone in self.tmd.bones:
                 tmbone: TMDBone
                 
-                if str(tmbone.hash) in hashes:
-                    tmbone.name = hashes[str(tmbone.hash)]
+                tmbone.name = bone_name(tmbone.hash, tmbone.name)
                 bbone = armature_obj.data.edit_bones.new(tmbone.name)
                 
                 matrix = Matrix(tmbone.matrix).transposed().inverted()
@@ -1006,12 +1167,10 @@ class importTMD:
 
                 bm.verts.ensure_lookup_table()
                 
-                #face data
-                for tri in tmd_mesh.triangles:
-                    try:
-                        face = bm.faces.new([bm_verts[i] for i in tri])
-                    except:
-                        continue
+                #face data, degenerate and repeated triangles are dropped up front
+                clean_tris, _ = clean_triangles(tmd_mesh.triangles)
+                for tri in clean_tris.tolist():
+                    face = bm.faces.new([bm_verts[i] for i in tri])
                     face.smooth = True
                     face.material_index = model_mats[tmd_mesh.material]
                     
@@ -1056,8 +1215,9 @@ class importTMD:
 
 
 
-def importLDS(file_path, return_tex = False):
-    lds = readLDS(file_path)
+def importLDS(file_path, return_tex = False, lds = None):
+    if lds is None:
+        lds = readLDS(file_path)
 
     images_list = []
     
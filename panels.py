@@ -1,5 +1,5 @@
 import bpy
-from bpy.types import PropertyGroup, Panel
+from bpy.types import PropertyGroup, Panel, AddonPreferences
 from bpy.props import (
     FloatProperty,
     IntProperty,
@@ -8,6 +8,8 @@ from bpy.props import (
     BoolProperty,
     PointerProperty
 )
+from .cache import configure_cache, default_cache_directory
+from .bone_hashes import configure_bone_hashes
 
 
 class TMD2ShaderParam(PropertyGroup):
@@ -466,6 +468,105 @@ class TMD2_Texture_OT_OpenDDS(bpy.types.Operator):
             
 
 
+class TMD2IndexProperties(PropertyGroup):
+    directory: StringProperty(
+        name="Game Directory",
+        subtype='DIR_PATH',
+        description="Extracted game directory, the index is stored inside it"
+    )
+    bone: StringProperty(name="Bone", description="Bone name or hash")
+    shader: StringProperty(name="Shader ID")
+    texture: StringProperty(name="Texture", description="Texture name or hash")
+    model: StringProperty(name="Model Name")
+    max_results: IntProperty(name="Max Imports", default=10, min=1)
+
+
+class TMD2_PT_AssetIndex(Panel):
+    bl_idname = 'VIEW3D_PT_tmd2_asset_index'
+    bl_label = 'TMD2 Asset Index'
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'TMD2'
+
+    def draw(self, context):
+        layout = self.layout
+        props = context.scene.tmd2_index
+        
+        layout.prop(props, "directory")
+        layout.operator("import_scene.tmd2_update_index", icon="FILE_REFRESH")
+        
+        box = layout.box()
+        box.prop(props, "bone")
+        box.prop(props, "shader")
+        box.prop(props, "texture")
+        box.prop(props, "model")
+        box.prop(props, "max_results")
+        box.operator("import_scene.tmd2_from_index", icon="IMPORT")
+
+
+def update_cache_settings(self, context):
+    configure_cache(self.cache_directory or default_cache_directory(),
+                    self.cache_size * (1 << 20),
+                    self.use_payload_cache,
+                    self.use_model_cache)
+
+
+def update_bone_hashes(self, context):
+    configure_bone_hashes(bpy.path.abspath(path.strip()) for path in self.bone_dictionaries.split(";"))
+
+
+class TMD2AddonPreferences(AddonPreferences):
+    bl_idname = __package__
+
+    use_payload_cache: BoolProperty(
+        name="Cache Decompressed Files",
+        default=True,
+        description="Keep inflated PZZE payloads on disk so unchanged files are not decompressed again",
+        update=update_cache_settings
+    )
+
+    use_model_cache: BoolProperty(
+        name="Cache Parsed Models",
+        default=True,
+        description="Store parsed TMD2 files in a binary sidecar that reloads much faster than parsing",
+        update=update_cache_settings
+    )
+
+    cache_directory: StringProperty(
+        name="Cache Directory",
+        subtype='DIR_PATH',
+        default="",
+        description="Where cached payloads are stored. Leave empty to use the per-user cache directory of the add-on",
+        update=update_cache_settings
+    )
+
+    cache_size: IntProperty(
+        name="Cache Size (MB)",
+        default=1024,
+        min=16,
+        description="Least recently used entries are removed once a cache grows past this size",
+        update=update_cache_settings
+    )
+
+    bone_dictionaries: StringProperty(
+        name="Bone Name Dictionaries",
+        default="",
+        description="Extra bone names, separate several files with ';'. Either JSON files mapping hashes to names like hashes.json or text files with one name per line. They override the built-in names",
+        update=update_bone_hashes
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        row = layout.row()
+        row.prop(self, "use_payload_cache")
+        row.prop(self, "use_model_cache")
+        row = layout.row()
+        row.enabled = self.use_payload_cache or self.use_model_cache
+        row.prop(self, "cache_directory")
+        row.prop(self, "cache_size")
+        layout.prop(self, "bone_dictionaries")
+
+
 material_properties = [
     TMD2Properties,
     TMD2ShaderParam,
@@ -484,12 +585,14 @@ material_properties = [
     TMD2_OT_PasteMaterialData,
     TMD2_OT_CopyParams,
     TMD2_OT_PasteParams,
-    TMD2_Texture_OT_OpenDDS
+    TMD2_Texture_OT_OpenDDS,
+    TMD2IndexProperties
     
 ]
 
 material_panels = [
     TMD2_PT_Panel,
     TMD2_PT_MaterialPanel,
-    TMD2_PT_MeshPanel
+    TMD2_PT_MeshPanel,
+    TMD2_PT_AssetIndex
 ]
\ No newline at end of file
@@ -0,0 +1,156 @@
+# Inventory of Tamsoft files, every file is parsed and summarized without importing it
+# Usage (from the directory that contains the add-on):
+#     python -m BlenderTMD2.probe <directory> [--format json|csv] [--output file] [--workers N]
+import os, sys, csv, json, struct, argparse
+from .reader import readTMD2, load_tamsoft, extension_kinds
+from .workers import process_pool, default_worker_count
+
+
+# Return (width, height) from a DDS header, (0, 0) if the data isn't a DDS file
+def texture_size(data):
+    if len(data) < 20 or bytes(data[:4]) != b"DDS ":
+        return 0, 0
+    height, width = struct.unpack_from("<II", data, 12)
+    return width, height
+
+
+def summarize_model(model):
+    materials = getattr(model, "materials", [])
+    textures = getattr(model, "textures", [])
+    bones = getattr(model, "bones", [])
+    models = getattr(model, "models", [])
+    return {
+        "version": getattr(model, "version", None),
+        "modelFlags": getattr(model, "modelFlags", None),
+        "bone_count": len(bones),
+        "model_count": len(models),
+        "material_count": len(materials),
+        "texture_count": len(textures),
+        "shader_ids": sorted({mat.shaderID for mat in materials}),
+        "bone_hashes": [bone.hash for bone in bones],
+        "texture_sizes": [(tex.width, tex.height) for tex in textures],
+        "model_names": [(m.name, m.hash) for m in models],
+        "material_hashes": [(mat.hash, mat.shaderID) for mat in materials],
+        "texture_hashes": [tex.hash for tex in textures],
+    }
+
+
+def summarize_lds(lds):
+    return {
+        "texture_count": len(lds.textures),
+        "texture_sizes": [texture_size(tex) for tex in lds.textures],
+    }
+
+
+def summarize_cats(cats):
+    return {
+        "sub_archives": {c.name: c.catCount for c in cats.subCATS},
+    }
+
+
+def summarize_tmo(tmo):
+    hashes = list(tmo.hashes)
+    return {
+        "bone_count": len(hashes),
+        "bone_hashes": hashes,
+    }
+
+
+summaries = {
+    "tmd2": summarize_model,
+    "tmd": summarize_model,
+    "lds": summarize_lds,
+    "cats": summarize_cats,
+    "tmo": summarize_tmo,
+}
+
+
+# Return a summary dict of one file, errors are reported in the "error" field
+def probe_file(path, use_cache = True):
+    kind = extension_kinds.get(os.path.splitext(path)[1].lower())
+    st = os.stat(path)
+    summary = {"path": path, "kind": kind, "size": st.st_size, "mtime": st.st_mtime_ns}
+    try:
+        if kind == "tmd2":
+            # sidecars and payloads the imports already cached are reused, but a scan never writes
+            # any: a whole game dump would flush both caches before an entry is used again.
+            # Unchanged files aren't probed again by the asset index anyway.
+            data = readTMD2(path, use_cache = use_cache, write_cache = False)
+        else:
+            data = load_tamsoft(path, kind, use_cache = use_cache, write_cache = False)
+        summary.update(summaries[kind](data))
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+    return summary
+
+
+def find_files(root, kinds = None):
+    paths = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            kind = extension_kinds.get(os.path.splitext(name)[1].lower())
+            if kind and (not kinds or kind in kinds):
+                paths.append(os.path.join(directory, name))
+    paths.sort()
+    return paths
+
+
+# Probe a list of files across a process pool, results keep the order of paths
+def probe_files(paths, workers = None, use_cache = True):
+    if workers == 1 or len(paths) < 2:
+        return [probe_file(path, use_cache) for path in paths]
+
+    with process_pool(workers or default_worker_count()) as pool:
+        return list(pool.map(probe_file, paths, [use_cache] * len(paths), chunksize=16))
+
+
+# Probe every Tamsoft file under root across a process pool
+def probe_directory(root, kinds = None, workers = None, use_cache = True):
+    return probe_files(find_files(root, kinds), workers, use_cache)
+
+
+def write_json(results, f):
+    json.dump(results, f, indent=2, default=str)
+
+
+def write_csv(results, f):
+    columns = []
+    for summary in results:
+        columns.extend(key for key in summary if key not in columns)
+
+    writer = csv.DictWriter(f, fieldnames=columns)
+    writer.writeheader()
+    for summary in results:
+        row = {}
+        for key, value in summary.items():
+            if isinstance(value, dict):
+                value = ";".join(f"{k}={v}" for k, v in value.items())
+            elif isinstance(value, (list, tuple)):
+                sep = "x" if key == "texture_sizes" else ":"
+                value = ";".join(sep.join(map(str, v)) if isinstance(v, tuple) else str(v) for v in value)
+            row[key] = value
+        writer.writerow(row)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Summarize TMD2/TMD/LDS/TMO/CAT files without importing them.")
+    parser.add_argument("root", help="Directory to scan recursively")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("--output", help="Write to this file instead of stdout")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, 1 disables the pool")
+    parser.add_argument("--kinds", nargs="*", choices=sorted(summaries), help="Only probe these formats")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read the model sidecars and payloads cached by imports")
+    args = parser.parse_args(argv)
+
+    results = probe_directory(args.root, args.kinds, args.workers, not args.no_cache)
+
+    writer = write_csv if args.format == "csv" else write_json
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer(results, f)
+    else:
+        writer(results, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
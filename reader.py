@@ -5,175 +5,565 @@ from .tamLib.tmd2 import *
 from .tamLib.lds import *
 from .tamLib.cats import *
 from .tamLib.tmo import *
-import os
+from .cache import payload_cache, model_cache, dump_sidecar, load_sidecar
+from .transport import share
+import os, io, mmap, struct, hashlib, tempfile, zlib
+from time import perf_counter
+from contextlib import contextmanager
 
 
-def readTMD2(file: str) -> TMD2:
+# Open a file once and yield a read-only (memory mapped) view over its contents
+@contextmanager
+def open_input(file: str, use_mmap: bool = True):
     with open(file, 'rb') as f:
-        #read magic
-        magic = f.read(4).decode('utf-8')
-        f.seek(0)  # Reset file pointer to the beginning for reading the TMD2 data
-        if magic == "PZZE":
-            pzze = readPZZE(file)
-            
-            tmd_data = pzze.decompress()
-            if tmd_data is None:
-                raise ValueError("Failed to decompress TMD2 data.")
-            if not tmd_data.startswith(b'tmd0'):
-                raise ValueError("Invalid TMD2 magic.")
+        if not use_mmap or os.fstat(f.fileno()).st_size == 0:
+            mm = None
+            view = memoryview(f.read())
         else:
-            tmd_data = f.read()
-            tmd_magic = tmd_data[:4].decode('utf-8')
-            if tmd_magic != "tmd0":
-                raise ValueError("Invalid TMD2 magic. Expected 'tmd0', got: " + tmd_magic)
-        
-        br = BinaryReader(tmd_data, Endian.LITTLE)
-        
-        file_name = os.path.splitext(os.path.basename(file))[0]
-        
-        tmd2 = br.read_struct(TMD2, None, file_name)
-        return tmd2
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mm)
+    try:
+        yield view
+    finally:
+        try:
+            view.release()
+            if mm is not None:
+                mm.close()
+        except BufferError:
+            # the parser kept a slice of the mapping alive, it goes away with the last reference
+            pass
 
 
-def readTMD(file: str, texture_names = {}):
-    with open(file, 'rb') as f:
-        #read magic
-        magic = f.read(4).decode('utf-8')
-        f.seek(0)  # Reset file pointer to the beginning for reading the TMD2 data
-        if magic == "PZZE":
-            pzze = readPZZE(file)
-            
-            tmd_data = pzze.decompress()
-            if tmd_data is None:
-                raise ValueError("Failed to decompress TMD2 data.")
-            if not tmd_data.startswith(b'tmd0'):
-                raise ValueError("Invalid TMD2 magic.")
-        else:
-            tmd_data = f.read()
-            tmd_magic = tmd_data[:4].decode('utf-8')
-            if tmd_magic != "tmd0":
-                raise ValueError("Invalid TMD2 magic. Expected 'tmd0', got: " + tmd_magic)
-        
-        br = BinaryReader(tmd_data, Endian.LITTLE)
-        
-        file_name = os.path.splitext(os.path.basename(file))[0]
-        
-        tmd = br.read_struct(TMD, None, file_name, texture_names)
-        return tmd
+PZZE_CHUNK_SIZE = 1 << 20
 
 
-def readLDS(file: str) -> LDS:
-    with open(file, 'rb') as f:
-        #read magic
-        magic = f.read(4).decode('utf-8')
-        f.seek(0)  # Reset file pointer to the beginning for reading the LDS data
-        if magic == "PZZE":
-            pzze = readPZZE(file)
-            
-            lds_data = pzze.decompress()
-            if lds_data is None:
-                raise ValueError("Failed to decompress LDS data.")
+# Offset of the zlib stream that follows the PZZE header
+def find_zlib_stream(view, limit = 0x40) -> int:
+    for offset in range(4, min(limit, len(view) - 1)):
+        cmf, flg = view[offset], view[offset + 1]
+        if cmf & 0x0F != 8 or cmf >> 4 > 7 or flg & 0x20 or ((cmf << 8) | flg) % 31:
+            continue
+        try:
+            zlib.decompressobj().decompress(view[offset:offset + 0x100], 1)
+        except zlib.error:
+            continue
+        return offset
+    raise ValueError("Could not find the zlib stream in PZZE data.")
 
-        else:
-            lds_data = f.read()
-        
-    file_name = os.path.splitext(os.path.basename(file))[0]
-    br = BinaryReader(lds_data, Endian.LITTLE)    
-    lds = br.read_struct(LDS, None, file_name)
-    return lds
 
+# uint32 header fields that depend on the data, by what they hold
+pzze_size_fields = ("size", "compressed", "total")
 
-def readCATS(file: str) -> CATS:
-    with open(file, 'rb') as f:
-        magic = f.read(4).decode('utf-8')
-        f.seek(0)  # Reset file pointer to the beginning for reading the CATS data
-        if magic == "PZZE":
-            pzze = readPZZE(file)
-            
-            cats_data = pzze.decompress()
-            if cats_data is None:
-                raise ValueError("Failed to decompress CAT data.")
-            if not cats_data.startswith(b'CATS'):
-                raise ValueError("Invalid CATS magic.")
-            
-            
+
+# PZZE header tamLib writes for one file format, its size fields and the padding after the zlib stream
+class PZZELayout:
+    def __init__(self, header, fields, alignment, fmt, level = None):
+        self.header = header
+        self.fields = fields
+        self.alignment = alignment
+        self.fmt = fmt
+        self.level = level
+
+
+    def field(self, view, name):
+        for offset, field in self.fields.items():
+            if field == name:
+                return struct.unpack_from(self.fmt, view, offset)[0]
+        return None
+
+
+    # Whether view starts with this header, size fields aside
+    def matches(self, view):
+        if len(view) < len(self.header):
+            return False
+        for offset in range(0, len(self.header), 4):
+            if offset not in self.fields and view[offset:offset + 4] != self.header[offset:offset + 4]:
+                return False
+        return True
+
+
+    def pack_header(self, size, compressed):
+        values = {"size": size, "compressed": compressed, "total": len(self.header) + compressed + len(self.padding(compressed))}
+        header = bytearray(self.header)
+        for offset, name in self.fields.items():
+            struct.pack_into(self.fmt, header, offset, values[name])
+        return header
+
+
+    def padding(self, compressed):
+        return bytes(-(len(self.header) + compressed) % self.alignment)
+
+
+def _sample_payload(size):
+    return bytes((i * 7 + i // 251) & 0xFF for i in range(size))
+
+
+def _tamlib_pzze(file_format, data):
+    pzze = PZZEFile()
+    pzze.fileFormat = file_format
+    pzze.decompressedData = data
+    br = BinaryReader()
+    br.write_struct(pzze)
+    raw = bytes(br.buffer())
+
+    # header, zlib stream size, trailer
+    start = find_zlib_stream(raw)
+    decompressor = zlib.decompressobj()
+    if decompressor.decompress(raw[start:]) != data or not decompressor.eof:
+        raise ValueError("PZZE sample doesn't round trip.")
+    end = len(raw) - len(decompressor.unused_data)
+    return raw, raw[:start], end - start, raw[end:]
+
+
+def _tamlib_level(samples):
+    # the zlib level PZZEFile compresses with, None when no level reproduces its streams
+    for level in range(10):
+        if all(zlib.compress(_sample_payload(size), level) == raw[len(header):len(header) + compressed]
+               for size, raw, header, compressed, trailer in samples):
+            return level
+    return None
+
+
+def _learn_pzze_layout(file_format):
+    # compare what tamLib writes for payloads of different sizes, then check the result on a third one
+    samples = [(len(data), *_tamlib_pzze(file_format, data)) for data in map(_sample_payload, (0x1357, 0x24681, 0x8ACE))]
+    (size1, raw1, header1, compressed1, trailer1), (size2, raw2, header2, compressed2, trailer2), check = samples
+    if len(header1) != len(header2) or len(header1) % 4:
+        return None
+
+    for fmt in ("<I", ">I"):
+        fields = {}
+        for offset in range(0, len(header1), 4):
+            if header1[offset:offset + 4] == header2[offset:offset + 4]:
+                continue
+            value1 = struct.unpack_from(fmt, header1, offset)[0]
+            value2 = struct.unpack_from(fmt, header2, offset)[0]
+            name = next((name for name, v1, v2 in zip(pzze_size_fields, (size1, compressed1, len(raw1)), (size2, compressed2, len(raw2)))
+                         if value1 == v1 and value2 == v2), None)
+            if name is None:
+                break
+            fields[offset] = name
         else:
-            cats_data = f.read()
-            
-        br = BinaryReader(cats_data, Endian.LITTLE)
-        cats = br.read_struct(CATS)
-        return cats
+            for alignment in (1 << i for i in range(13)):
+                layout = PZZELayout(header1, fields, alignment, fmt)
+                if any(trailer.strip(b"\0") or trailer != layout.padding(compressed)
+                       for compressed, trailer in ((compressed1, trailer1), (compressed2, trailer2))):
+                    continue
+                size, raw, header, compressed, trailer = check
+                if layout.pack_header(size, compressed) == header and layout.padding(compressed) == trailer:
+                    layout.level = _tamlib_level(samples)
+                    return layout
+                return None
+    return None
+
+
+_pzze_layouts = {}
+
+# PZZELayout of a file format, None when it couldn't be worked out and PZZEFile has to be used
+def pzze_layout(file_format = "tmd2"):
+    if file_format not in _pzze_layouts:
+        try:
+            _pzze_layouts[file_format] = _learn_pzze_layout(file_format)
+        except Exception:
+            _pzze_layouts[file_format] = None
+    return _pzze_layouts[file_format]
+
+
+# fileFormat values this add-on writes PZZE archives with
+pzze_file_formats = ("cat", "tmd2", "lds", "tmd", "tmo")
+
+# fileFormat a PZZE archive was written with, read from its header only
+def pzze_file_format(view):
+    for file_format in pzze_file_formats:
+        layout = pzze_layout(file_format)
+        if layout is not None and layout.matches(view):
+            return file_format
+    return None
+
+
+# Inflate the zlib stream at start in chunks of at most chunk_size bytes
+def iter_pzze_chunks(view, start, chunk_size = PZZE_CHUNK_SIZE):
+    decompressor = zlib.decompressobj()
+    for pos in range(start, len(view), chunk_size):
+        data = view[pos:pos + chunk_size]
+        while data and not decompressor.eof:
+            chunk = decompressor.decompress(data, chunk_size)
+            if chunk:
+                yield chunk
+            data = decompressor.unconsumed_tail
+        if decompressor.eof:
+            break
+    
+    chunk = decompressor.flush()
+    if chunk:
+        yield chunk
+    if not decompressor.eof:
+        raise ValueError("Failed to decompress PZZE data, the archive is truncated.")
+
+
+def decompress_pzze(view):
+    data = BinaryReader(view, Endian.LITTLE).read_struct(PZZEFile).decompress()
+    if data is None:
+        raise ValueError("Failed to decompress PZZE data.")
+    return data
+
+
+# Stream a PZZE payload into a file, redone with PZZEFile if the size doesn't match the header
+def inflate_to_file(view, out, chunk_size = PZZE_CHUNK_SIZE) -> int:
+    file_format = pzze_file_format(view)
+    layout = pzze_layout(file_format) if file_format else None
+    if layout is not None and layout.field(view, "size") is not None:
+        size = 0
+        try:
+            for chunk in iter_pzze_chunks(view, len(layout.header), chunk_size):
+                out.write(chunk)
+                size += len(chunk)
+            if size == layout.field(view, "size"):
+                return size
+        except (ValueError, zlib.error):
+            pass
+        out.seek(0)
+        out.truncate()
+    
+    data = decompress_pzze(view)
+    out.write(data)
+    return len(data)
+
+
+def _map_file(f):
+    # the mapping stays alive for as long as the returned view (or a slice of it) is referenced
+    f.flush()
+    if os.fstat(f.fileno()).st_size == 0:
+        return memoryview(b"")
+    return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
 
+def _inflate_to_map(view):
+    # for payloads that are sliced rather than parsed, BinaryReader would copy a mapped payload to the heap anyway
+    with tempfile.TemporaryFile() as f:
+        inflate_to_file(view, f)
+        return _map_file(f)
 
-def readTMO(file: str) -> TMO:
+
+# Mapped payload of a PZZE file from payload_cache, inflated into the cache on a miss, None when the cache can't serve it
+def cached_payload(file: str, view, label: str = "Tamsoft", write = True):
+    key = payload_cache.key(file)
+    entry = payload_cache.get(key)
+    try:
+        if entry is None:
+            if not write:
+                return None
+            with payload_cache.writer(key) as f:
+                inflate_to_file(view, f)
+            entry = payload_cache.entry_path(key)
+        with open(entry, 'rb') as f:
+            return _map_file(f)
+    except OSError:
+        # the cache directory isn't usable, or the entry was evicted by another process in the meantime
+        return None
+    except (ValueError, zlib.error) as e:
+        raise ValueError(f"Failed to decompress {label} data.") from e
+
+
+# Decompressed payload of a file as a mapped view that outlives the file handle
+def map_payload(file: str, label: str = "Tamsoft"):
     with open(file, 'rb') as f:
-        magic = f.read(4).decode('utf-8')
-        f.seek(0)  # Reset file pointer to the beginning for reading the CATS data
-        if magic == "PZZE":
-            pzze = readPZZE(file)
-            
-            tmo_data = pzze.decompress()
-            if tmo_data is None:
-                raise ValueError("Failed to decompress TMO data.")
-            if not tmo_data.startswith(b'tmo1'):
-                raise ValueError("Invalid TMO magic.")
-            
-        else:
-            tmo_data = f.read()
-        
-        file_name = os.path.splitext(os.path.basename(file))[0]
-        br = BinaryReader(tmo_data, Endian.LITTLE)
-        tmo = br.read_struct(TMO)
-        tmo.name = file_name
-        return tmo
+        view = _map_file(f)
+    if view[:4] != b"PZZE":
+        return view
+    if payload_cache.enabled:
+        data = cached_payload(file, view, label)
+        if data is not None:
+            return data
+    try:
+        return _inflate_to_map(view)
+    except (ValueError, zlib.error) as e:
+        raise ValueError(f"Failed to decompress {label} data.") from e
 
 
-def writeTMD2(tmd2, output, compress = False):
-    br = BinaryReader()
-    br.write_struct(tmd2)
+# Decompressed payload of a PZZE archive, anything else is returned as is
+def inflate_payload(view, label: str = "Tamsoft"):
+    if view[:4] != b"PZZE":
+        return view
     
-    filebytes = bytes(br.buffer())
+    try:
+        return decompress_pzze(view)
+    except ValueError as e:
+        raise ValueError(f"Failed to decompress {label} data.") from e
+
+
+def check_magic(data, magic: bytes, label: str):
+    if magic and data[:4] != magic:
+        found = bytes(data[:4]).decode('utf-8', 'replace')
+        raise ValueError(f"Invalid {label} magic. Expected '{magic.decode()}', got: {found}")
+
+
+# Guess the format of a payload from its magic, LDS archives have none
+def sniff_kind(data, ext: str = "") -> str:
+    magic = bytes(data[:4])
+    if magic == b'tmd0':
+        return "tmd" if ext == ".tmd" else "tmd2"
+    if magic in magic_kinds:
+        return magic_kinds[magic]
+    if not ext or extension_kinds.get(ext) == "lds":
+        return "lds"
+    raise ValueError(f"Unrecognized Tamsoft file, magic: {magic}")
+
+
+def _parse_tmd2(br: BinaryReader, name, **kwargs):
+    return br.read_struct(TMD2, None, name)
+
+def _parse_tmd(br: BinaryReader, name, texture_names = {}, **kwargs):
+    return br.read_struct(TMD, None, name, texture_names)
+
+def _parse_lds(br: BinaryReader, name, **kwargs):
+    return br.read_struct(LDS, None, name)
+
+def _parse_cats(br: BinaryReader, name, **kwargs):
+    return br.read_struct(CATS)
+
+def _parse_tmo(br: BinaryReader, name, **kwargs):
+    tmo = br.read_struct(TMO)
+    tmo.name = name
+    return tmo
+
+
+# kind: (magic, label, parser)
+tamsoft_formats = {
+    "tmd2": (b'tmd0', "TMD2", _parse_tmd2),
+    "tmd": (b'tmd0', "TMD", _parse_tmd),
+    "lds": (b'', "LDS", _parse_lds),
+    "cats": (b'CATS', "CAT", _parse_cats),
+    "tmo": (b'tmo1', "TMO", _parse_tmo),
+}
+
+magic_kinds = {
+    b'tmo1': "tmo",
+    b'CATS': "cats",
+}
+
+extension_kinds = {
+    ".tmd2": "tmd2",
+    ".tmd": "tmd",
+    ".lds": "lds",
+    ".cat": "cats",
+    ".tmo": "tmo",
+}
+
+
+# Parse a decompressed payload, sniffing its format when kind isn't given
+def parse_payload(data, kind: str = None, name: str = "", ext: str = "", **kwargs):
+    if kind is None:
+        kind = sniff_kind(data, ext)
+    magic, label, parse = tamsoft_formats[kind]
+    check_magic(data, magic, label)
     
-    if compress:
-        pzze = PZZEFile()
-        pzze.fileFormat = 'tmd2'
-        pzze.decompressedData = filebytes
-        
-        br = BinaryReader()
-        br.write_struct(pzze)
-        
-        filebytes = bytes(br.buffer())
+    br = BinaryReader(data, Endian.LITTLE)
+    return parse(br, name, **kwargs)
+
+
+# Load any Tamsoft file (TMD2, TMD, LDS, CATS, TMO) from a path or a buffer
+def load_tamsoft(path_or_buffer, kind: str = None, name: str = None, use_mmap = True, use_cache = True, write_cache = True, **kwargs):
+    if isinstance(path_or_buffer, (str, os.PathLike)):
+        path = os.fspath(path_or_buffer)
+        base_name, ext = os.path.splitext(os.path.basename(path))
+        label = tamsoft_formats[kind][1] if kind else "Tamsoft"
+        with open_input(path, use_mmap) as view:
+            data = None
+            if view[:4] == b"PZZE" and use_cache and payload_cache.enabled:
+                data = cached_payload(path, view, label, write_cache)
+            if data is None:
+                data = inflate_payload(view, label)
+            return parse_payload(data, kind, base_name if name is None else name, ext.lower(), **kwargs)
     
-    with open(output, "wb") as f:
-        f.write(filebytes)
+    view = memoryview(path_or_buffer)
+    data = inflate_payload(view, tamsoft_formats[kind][1] if kind else "Tamsoft")
+    return parse_payload(data, kind, name or "", **kwargs)
 
 
-def writeTMD(tmd, output):
-    br = BinaryReader()
-    br.write_struct(tmd)
+_layout_version = None
+
+# Fingerprint of the tamLib sources, cached models are only valid for the layout that wrote them
+def tamlib_layout_version() -> str:
+    global _layout_version
+    if _layout_version is None:
+        digest = hashlib.sha1()
+        tamlib_dir = os.path.join(os.path.dirname(__file__), "tamLib")
+        for root, dirs, files in os.walk(tamlib_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith(('.', '__')))
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    with open(os.path.join(root, name), 'rb') as f:
+                        digest.update(name.encode('utf-8'))
+                        digest.update(f.read())
+        _layout_version = digest.hexdigest()
+    return _layout_version
+
+
+# Load a parsed model from model_cache, parsing it and writing its sidecar on a miss
+def cached_model(file: str, kind: str, copy = True, use_mmap = True, write = True):
+    key = model_cache.key(file, kind, tamlib_layout_version())
+    entry = model_cache.get(key)
+    if entry is not None:
+        try:
+            with open(entry, 'rb') as f:
+                return load_sidecar(_map_file(f), copy)
+        except Exception:
+            # stale or unreadable sidecar, parse the file again and overwrite it
+            pass
     
-    filebytes = bytes(br.buffer())
+    obj = load_tamsoft(file, kind, use_mmap = use_mmap, write_cache = write)
+    if not write:
+        return obj
+    try:
+        with model_cache.writer(key) as f:
+            dump_sidecar(obj, f)
+    except Exception:
+        # a model that can't be serialized is still a valid import, it just won't be cached
+        pass
+    return obj
+
+
+def readTMD2(file: str, use_mmap = True, use_cache = True, write_cache = True) -> TMD2:
+    if use_cache and model_cache.enabled:
+        return cached_model(file, "tmd2", use_mmap = use_mmap, write = write_cache)
+    return load_tamsoft(file, "tmd2", use_mmap = use_mmap, use_cache = use_cache, write_cache = write_cache)
+
+
+# Worker task of the import pipeline, textures are returned as bytes
+def readTMD2WithTextures(file: str, texture_file: str = "", use_cache = True):
+    tmd2 = readTMD2(file, use_cache = use_cache)
+    lds = None
+    if texture_file:
+        lds = readLDS(texture_file)
+        lds.textures = [bytes(texture) for texture in lds.textures]
+    return share((tmd2, lds))
+
+
+def readTMD(file: str, texture_names = {}, use_mmap = True):
+    return load_tamsoft(file, "tmd", use_mmap = use_mmap, texture_names = texture_names)
+
+
+def readLDS(file: str, use_mmap = True) -> LDS:
+    return load_tamsoft(file, "lds", use_mmap = use_mmap)
+
+
+def readCATS(file: str, use_mmap = True) -> CATS:
+    return load_tamsoft(file, "cats", use_mmap = use_mmap)
+
+
+def readTMO(file: str, use_mmap = True) -> TMO:
+    return load_tamsoft(file, "tmo", use_mmap = use_mmap)
+
+
+# zlib level per profile, None is the level PZZEFile compresses with (see _tamlib_level)
+compression_profiles = {
+    "fast": 1,
+    "balanced": None,
+    "max": 9,
+}
+
+
+# Stream the payload chunks into a PZZE container, the header is patched in once the sizes are known
+def write_pzze(chunks, f, file_format, level = -1) -> int:
+    layout = pzze_layout(file_format)
+    start = f.tell()
+    f.write(layout.header)
+
+    compressor = zlib.compressobj(level)
+    size = compressed = 0
+    for chunk in chunks:
+        view = memoryview(chunk).cast("B")
+        for pos in range(0, len(view), PZZE_CHUNK_SIZE):
+            data = compressor.compress(view[pos:pos + PZZE_CHUNK_SIZE])
+            f.write(data)
+            compressed += len(data)
+        size += len(view)
+    data = compressor.flush()
+    f.write(data)
+    compressed += len(data)
+    f.write(layout.padding(compressed))
+
+    end = f.tell()
+    f.seek(start)
+    f.write(layout.pack_header(size, compressed))
+    f.seek(end)
+    return end - start
+
+
+# Write a payload to a path or file object, PZZE compressed with the zlib level of profile when file_format is given
+def write_payload(buffer, output, file_format = None, profile = "balanced") -> dict:
+    stats = {"size": len(buffer), "written": len(buffer), "time": 0.0}
+    if file_format:
+        level = compression_profiles[profile]
+        layout = pzze_layout(file_format)
+        start_time = perf_counter()
+        if level is None and layout is not None:
+            level = layout.level
+        if layout is None or level is None:
+            # only tamLib knows the container or its zlib level, let it write the file
+            if compression_profiles[profile] is not None:
+                raise ValueError(f"The {profile} compression profile isn't supported for {file_format} files, use balanced.")
+            pzze = PZZEFile()
+            pzze.fileFormat = file_format
+            pzze.decompressedData = buffer
+            br = BinaryReader()
+            br.write_struct(pzze)
+            buffer = br.buffer()
+            stats["written"] = len(buffer)
+        else:
+            if isinstance(output, (str, os.PathLike)):
+                with open(output, "wb") as f:
+                    stats["written"] = write_pzze((buffer,), f, file_format, level)
+            elif output.seekable():
+                stats["written"] = write_pzze((buffer,), output, file_format, level)
+            else:
+                f = io.BytesIO()
+                stats["written"] = write_pzze((buffer,), f, file_format, level)
+                output.write(f.getbuffer())
+            stats["time"] = perf_counter() - start_time
+            return stats
+        stats["time"] = perf_counter() - start_time
     
-    with open(output, "wb") as f:
-        f.write(filebytes)
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "wb") as f:
+            f.write(buffer)
+    else:
+        output.write(buffer)
+    return stats
+
+
+def writeTMD2(tmd2, output, compress = False, profile = "balanced") -> dict:
+    br = BinaryReader()
+    br.write_struct(tmd2)
+    # don't keep the writer's buffer around while compressing its copy
+    buffer = br.buffer()
+    del br
+    return write_payload(buffer, output, 'tmd2' if compress else None, profile)
+
+
+def writeTMD(tmd, output) -> dict:
+    br = BinaryReader()
+    br.write_struct(tmd)
+    return write_payload(br.buffer(), output)
         
 
-def writeLDS(lds, output, compress = False):
+def writeLDS(lds, output, compress = False, profile = "balanced") -> dict:
     br = BinaryReader()
     br.write_struct(lds)
-    filebytes = bytes(br.buffer())
-    if compress:
-        pzze = PZZEFile()
-        pzze.fileFormat = 'lds'
-        pzze.decompressedData = filebytes
-        
-        br = BinaryReader()
-        br.write_struct(pzze)
-        
-        filebytes = bytes(br.buffer())
-    
-    with open(output, "wb") as f:
-        f.write(filebytes)
+    # don't keep the writer's buffer around while compressing its copy
+    buffer = br.buffer()
+    del br
+    return write_payload(buffer, output, 'lds' if compress else None, profile)
+
+
+def writeCATS(cats, output, file_format = None, profile = "balanced") -> dict:
+    br = BinaryReader()
+    br.write_struct(cats)
+    # archives can be large, don't keep the writer's buffer around while compressing its copy
+    buffer = br.buffer()
+    del br
+    return write_payload(buffer, output, file_format, profile)
 
 if __name__ == "__main__":
     path = r"G:\Dev\BlenderTMD2\pl000_cos00_00.tmd2"
@@ -0,0 +1,185 @@
+import bpy, hashlib
+import numpy as np
+from mathutils import Matrix, Vector, Quaternion
+from .geometry import bone_bind_matrices
+
+# Per-bone import data (bind matrix, pose offsets...) is stored once per armature as flat
+# arrays under this key instead of as custom properties on every bone, rows follow the
+# bone table. Bones only keep their "hash" property, which maps them back to a row.
+BONE_DATA_KEY = "tmd2_bones"
+
+# identifies the bone table an armature was built from, see skeleton_fingerprint
+FINGERPRINT_KEY = "tmd2_skeleton"
+
+ARMATURE_BATCH_SIZE = 16
+
+
+# Make bone names unique the way Blender does so vertex groups can be named before the bones exist
+def unique_bone_names(names):
+    used = set()
+    result = []
+    for name in names:
+        unique = name
+        i = 0
+        while unique in used:
+            i += 1
+            unique = f"{name}.{i:03d}"
+        used.add(unique)
+        result.append(unique)
+    return result
+
+
+# Hash of the bone hashes and parent indices, shared by models using the same skeleton
+def skeleton_fingerprint(tmbones):
+    table = np.array([(b.hash, b.parentIndex) for b in tmbones], dtype=np.int64).reshape(-1, 2)
+    return hashlib.sha1(table.astype("<i8").tobytes()).hexdigest()
+
+
+# Bone names of armature in bone table order, None when one of them is missing
+def armature_bone_names(armature, tmbones):
+    by_hash = {bone["hash"]: bone.name for bone in armature.bones if "hash" in bone}
+    names = [by_hash.get(str(b.hash)) for b in tmbones]
+    if None in names:
+        return None
+    return names
+
+
+def store_bone_data(armature, tmbones, bind):
+    # hashes are unsigned, ID properties only hold signed 32 bit ints
+    armature[BONE_DATA_KEY] = {
+        "hashes": np.array([b.hash for b in tmbones], dtype=np.uint32).view(np.int32).tolist(),
+        "matrices": bind.reshape(-1).tolist(),
+        "extra": [b.extra for b in tmbones],
+        "offset": np.asarray([b.offset for b in tmbones], dtype=np.float64).reshape(-1).tolist(),
+        "posed_loc": np.asarray([b.posedLocation for b in tmbones], dtype=np.float64).reshape(-1).tolist(),
+        "unk1": [b.unk1 for b in tmbones],
+    }
+
+
+# {bone name: {"hash", "matrix", "extra", "offset"}} of an imported armature, older imports are read from per-bone properties
+def bone_data(armature):
+    result = {}
+    rows = {}
+    data = armature.get(BONE_DATA_KEY)
+    if data is not None:
+        hashes = np.array(data["hashes"], dtype=np.int32).view(np.uint32).tolist()
+        rows = {h: i for i, h in enumerate(hashes)}
+        matrices = np.array(data["matrices"], dtype=np.float64).reshape(-1, 4, 4)
+        offsets = np.array(data["offset"], dtype=np.float64).reshape(len(hashes), -1)
+        extra = list(data["extra"])
+
+    for bone in armature.bones:
+        if "hash" not in bone:
+            continue
+        bone_hash = int(bone["hash"])
+        i = rows.get(bone_hash)
+        if i is not None:
+            result[bone.name] = {"hash": bone_hash, "matrix": Matrix(matrices[i].tolist()),
+                                 "extra": extra[i], "offset": offsets[i].tolist()}
+        elif "matrix" in bone:
+            result[bone.name] = {"hash": bone_hash, "matrix": Matrix(bone["matrix"]),
+                                 "extra": bone.get("extra", -1), "offset": list(bone.get("offset", (0, 0, 0)))}
+    return result
+
+
+# Armatures whose bones are built in one edit mode pass, when the batch fills up or is flushed
+class ArmatureBatch:
+    def __init__(self, context, size = ARMATURE_BATCH_SIZE):
+        self.context = context
+        self.size = size
+        self.pending = []
+        # fingerprint: (armature object, bone names) of the armatures added to this batch
+        self.skeletons = {}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+    def add(self, armature_obj, tmbones, names):
+        names = unique_bone_names(names)
+        bind, world = bone_bind_matrices([b.matrix for b in tmbones])
+        store_bone_data(armature_obj.data, tmbones, bind)
+        armature_obj.data.display_type = 'STICK'
+
+        fingerprint = skeleton_fingerprint(tmbones)
+        armature_obj.data[FINGERPRINT_KEY] = fingerprint
+        self.skeletons[fingerprint] = (armature_obj, names)
+
+        self.pending.append((armature_obj, tmbones, names, world))
+        if len(self.pending) >= self.size:
+            self.flush()
+        return names
+
+
+    # (armature object, bone names) of an armature built from the same bone table, including the ones in this batch
+    def find(self, tmbones):
+        fingerprint = skeleton_fingerprint(tmbones)
+        scene_objects = self.context.scene.objects
+
+        match = self.skeletons.get(fingerprint)
+        if match is not None and match[0].name in scene_objects:
+            return match
+
+        for obj in scene_objects:
+            if obj.type != 'ARMATURE' or obj.data.get(FINGERPRINT_KEY) != fingerprint:
+                continue
+            names = armature_bone_names(obj.data, tmbones)
+            if names is not None:
+                return obj, names
+        return None
+
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+
+        # every armature of the batch is edited at once
+        view_layer = self.context.view_layer
+        for obj in self.context.selected_objects:
+            obj.select_set(False)
+        for armature_obj, _, _, _ in pending:
+            armature_obj.select_set(True)
+        view_layer.objects.active = pending[-1][0]
+        bpy.ops.object.mode_set(mode='EDIT')
+
+        tail_offset = Vector((0, 0, 0.01))
+        for armature_obj, tmbones, names, world in pending:
+            edit_bones = armature_obj.data.edit_bones
+            created = [edit_bones.new(name) for name in names]
+            for bbone, tmbone, matrix in zip(created, tmbones, world.tolist()):
+                bbone.matrix = Matrix(matrix)
+                bbone.tail += tail_offset # Set the tail position to be 1 unit along the Z axis
+
+                if tmbone.parentIndex != -1:
+                    bbone.parent = created[tmbone.parentIndex]
+                bbone["hash"] = str(tmbone.hash)
+
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+        for armature_obj, tmbones, names, _ in pending:
+            pose_armature(armature_obj, tmbones, names)
+
+
+def pose_armature(armature_obj, tmbones, names):
+    #rotate bones
+    for name, tmbone in zip(names, tmbones):
+        if tmbone.extra < 0:
+            continue
+
+        p = armature_obj.pose.bones[name]
+        if not p.parent:
+            continue
+
+        rotation = tmbone.offset
+        axes = p.bone.matrix_local.to_3x3().transposed()
+        space = p.parent.matrix.to_3x3()
+        x, y, z = (space @ v for v in axes)
+
+        p.rotation_mode = 'QUATERNION'
+        p.rotation_quaternion = Quaternion(z, rotation[2]) @ Quaternion(y, rotation[1]) @ Quaternion(x, rotation[0])
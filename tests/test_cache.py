@@ -0,0 +1,109 @@
+import os, time, importlib.util
+import pytest
+
+# cache.py doesn't depend on bpy or tamLib, load it on its own
+spec = importlib.util.spec_from_file_location("tmd2_cache", os.path.join(os.path.dirname(__file__), os.pardir, "cache.py"))
+cache = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(cache)
+
+
+def write_entry(disk_cache, key, size):
+    with disk_cache.writer(key) as f:
+        f.write(bytes(size))
+    return disk_cache.entry_path(key)
+
+
+def age(path, seconds):
+    st = os.stat(path)
+    os.utime(path, (st.st_atime - seconds, st.st_mtime - seconds))
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    return cache.DiskCache(str(tmp_path / "entries"), 1000, ".bin")
+
+
+def test_least_recently_used_entries_are_evicted(disk_cache):
+    first = write_entry(disk_cache, "first", 400)
+    age(first, 20)
+    second = write_entry(disk_cache, "second", 400)
+    age(second, 10)
+    third = write_entry(disk_cache, "third", 400)
+
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+    assert os.path.exists(third)
+
+
+def test_hits_are_kept_over_older_entries(disk_cache):
+    first = write_entry(disk_cache, "first", 400)
+    age(first, 20)
+    second = write_entry(disk_cache, "second", 400)
+    age(second, 10)
+
+    assert disk_cache.get("first") == first
+    write_entry(disk_cache, "third", 400)
+
+    assert os.path.exists(first)
+    assert not os.path.exists(second)
+
+
+def test_new_entry_larger_than_the_cache_survives(disk_cache):
+    old = write_entry(disk_cache, "old", 100)
+    age(old, 10)
+    big = write_entry(disk_cache, "big", 5000)
+
+    assert os.path.exists(big)
+    assert not os.path.exists(old)
+    assert disk_cache.get("big") == big
+
+
+def test_explicit_evict_still_trims_to_size(disk_cache):
+    big = write_entry(disk_cache, "big", 5000)
+    disk_cache.evict()
+
+    assert not os.path.exists(big)
+    assert disk_cache.get("big") is None
+
+
+def test_failed_write_leaves_no_entry(disk_cache):
+    with pytest.raises(RuntimeError):
+        with disk_cache.writer("broken") as f:
+            f.write(b"partial")
+            raise RuntimeError()
+
+    assert disk_cache.get("broken") is None
+    assert not any(name.endswith(".tmp") for name in os.listdir(disk_cache.directory))
+
+
+def test_key_changes_with_the_source_file(disk_cache, tmp_path):
+    source = tmp_path / "model.tmd2"
+    source.write_bytes(b"one")
+    key = disk_cache.key(str(source))
+
+    time.sleep(0.01)
+    source.write_bytes(b"other")
+    assert disk_cache.key(str(source)) != key
+    assert disk_cache.key(str(source), "tmd2") != disk_cache.key(str(source), "lds")
+
+
+@pytest.mark.skipif(os.name == "nt", reason="ownership checks are POSIX only")
+def test_shared_directories_are_refused(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    disk_cache = cache.DiskCache(str(shared / "entries"), 1000, ".bin")
+
+    with pytest.raises(PermissionError):
+        write_entry(disk_cache, "planted", 10)
+
+    # an entry planted by someone else is never handed out
+    os.makedirs(disk_cache.directory, exist_ok=True)
+    with open(disk_cache.entry_path("planted"), "wb") as f:
+        f.write(b"payload")
+    assert disk_cache.get("planted") is None
+
+
+def test_default_directory_is_not_the_shared_temp_directory():
+    import tempfile
+    assert not cache.default_cache_directory().startswith(tempfile.gettempdir())
@@ -0,0 +1,103 @@
+import os, importlib.util
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# geometry.py only needs NumPy, load it on its own
+spec = importlib.util.spec_from_file_location("tmd2_geometry", os.path.join(os.path.dirname(__file__), os.pardir, "geometry.py"))
+geometry = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(geometry)
+
+
+def test_clean_triangles_drops_degenerate_and_repeated_faces():
+    triangles = [[0, 1, 2], [2, 0, 1], [3, 3, 4], [1, 2, 3], [3, 2, 1]]
+    clean, keep = geometry.clean_triangles(triangles)
+
+    assert clean.tolist() == [[0, 1, 2], [1, 2, 3]]
+    assert keep.tolist() == [True, False, False, True, False]
+
+
+def test_clean_triangles_handles_no_faces():
+    clean, keep = geometry.clean_triangles(np.zeros((0, 3)))
+
+    assert clean.shape == (0, 3)
+    assert len(keep) == 0
+
+
+def test_vertex_layout_without_weld_splits_submeshes():
+    sources, submeshes = geometry.model_vertex_layout([[0, 1, 2], [2, 3]])
+
+    assert sources.tolist() == [0, 1, 2, 2, 3]
+    assert [ids.tolist() for ids, _ in submeshes] == [[0, 1, 2], [3, 4]]
+    assert all(owned.all() for _, owned in submeshes)
+
+
+def test_welded_vertices_are_owned_by_the_first_submesh():
+    sources, submeshes = geometry.model_vertex_layout([[0, 1, 2], [2, 3]], weld = True)
+
+    assert sources.tolist() == [0, 1, 2, 3]
+    (first_ids, first_owned), (second_ids, second_owned) = submeshes
+    assert first_ids.tolist() == [0, 1, 2]
+    assert second_ids.tolist() == [2, 3]
+    assert first_owned.tolist() == [True, True, True]
+    assert second_owned.tolist() == [False, True]
+
+
+def test_repeated_welded_faces_get_their_submesh_vertices_back():
+    submesh_indices = [[0, 1, 2, 3], [1, 2, 3, 9]]
+    submesh_tris = [np.array([[0, 1, 2], [1, 2, 3]]), np.array([[0, 1, 2], [1, 2, 3]])]
+    sources, submeshes = geometry.model_vertex_layout(submesh_indices, weld = True)
+    welded = np.concatenate([ids[tris] for (ids, _), tris in zip(submeshes, submesh_tris)])
+    unwelded = np.concatenate([submesh_tris[0], submesh_tris[1] + 4])
+
+    triangles, split = geometry.unweld_repeated_faces(welded, unwelded, len(sources))
+
+    # the second submesh's first face repeats table vertices 1, 2, 3 of the first submesh
+    assert triangles.tolist() == [[0, 1, 2], [1, 2, 3], [5, 6, 7], [2, 3, 4]]
+    assert split.tolist() == [4, 5, 6]
+    assert np.concatenate(submesh_indices)[split].tolist() == [1, 2, 3]
+
+
+def test_unweld_keeps_distinct_faces_as_they_are():
+    triangles, split = geometry.unweld_repeated_faces([[0, 1, 2], [1, 2, 3]], [[0, 1, 2], [3, 4, 5]], 4)
+
+    assert triangles.tolist() == [[0, 1, 2], [1, 2, 3]]
+    assert len(split) == 0
+
+
+def test_skin_weight_entries_remap_bones_and_drop_empty_slots():
+    bone_ids = [[0, 1], [1, 0]]
+    bone_weights = [[0.75, 0.25], [1.0, 0.0]]
+    vertices, groups, weights = geometry.skin_weight_entries(bone_ids, bone_weights, [7, 3], [10, 11])
+
+    assert vertices.tolist() == [10, 10, 11]
+    assert groups.tolist() == [7, 3, 3]
+    assert weights.tolist() == [0.75, 0.25, 1.0]
+
+
+def test_skin_weight_runs_sum_slots_of_the_same_bone():
+    vertices = np.array([0, 0, 1, 2], dtype=np.int32)
+    groups = np.array([5, 5, 5, 2], dtype=np.int32)
+    weights = np.array([0.25, 0.25, 0.5, 1.0], dtype=np.float32)
+
+    runs = list(geometry.skin_weight_runs(vertices, groups, weights))
+
+    assert runs == [(2, 1.0, [2]), (5, 0.5, [0, 1])]
+
+
+def test_skin_weight_runs_split_groups_by_weight():
+    vertices = np.array([0, 1, 2], dtype=np.int32)
+    groups = np.array([1, 1, 1], dtype=np.int32)
+    weights = np.array([0.5, 1.0, 0.5], dtype=np.float32)
+
+    assert list(geometry.skin_weight_runs(vertices, groups, weights)) == [(1, 0.5, [0, 2]), (1, 1.0, [1])]
+    assert list(geometry.skin_weight_runs(vertices[:0], groups[:0], weights[:0])) == []
+
+
+def test_bone_bind_matrices_invert_the_transposed_matrices():
+    stored = np.eye(4)
+    stored[3, :3] = (1, 2, 3)
+    bind, armature = geometry.bone_bind_matrices([stored])
+
+    assert np.allclose(bind[0] @ stored.T, np.eye(4))
+    assert np.allclose(armature[0], geometry.YUP_TO_ZUP @ bind[0])
@@ -0,0 +1,124 @@
+import os, pickle, threading, multiprocessing
+from collections import deque
+from multiprocessing import shared_memory, resource_tracker
+
+# Parsed models are sent back from worker processes like the cached sidecars are stored:
+# the object graph is pickled, while contiguous NumPy arrays (vertex and index buffers) are
+# taken out of band and copied once into a shared memory block. The main process gets views
+# into that block instead of unpickling a second copy of the geometry.
+
+ALIGNMENT = 64
+
+# Windows frees a block as soon as its last handle closes, so workers hold on to the blocks
+# they created until the parent had time to attach (it does so as soon as a result arrives)
+_worker_blocks = deque(maxlen=16)
+
+# blocks released while views into them were still alive, closed once the views are gone.
+# attach sweeps on the executor's callback thread while the main thread releases blocks,
+# reentrant since a block dropped by the garbage collector releases itself
+_lingering = []
+_lingering_lock = threading.RLock()
+
+
+def _align(value):
+    return (value + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+# Picklable handle of an object whose buffers live in a shared memory block
+class SharedResult:
+    def __init__(self, name, records, table):
+        self.name = name
+        self.records = records
+        self.table = table
+
+
+def _close(block):
+    try:
+        block.close()
+    except BufferError:
+        return False
+    return True
+
+
+# Close the released blocks whose views have been garbage collected since
+def sweep():
+    with _lingering_lock:
+        blocks = _lingering[:]
+        # only the blocks taken, anything appended in the meantime stays queued
+        del _lingering[:len(blocks)]
+    remaining = [block for block in blocks if not _close(block)]
+    with _lingering_lock:
+        _lingering.extend(remaining)
+
+
+# The parent's side of a shared memory block, owns it until release is called
+class SharedBlock:
+    def __init__(self, block):
+        self.block = block
+
+
+    # Views that are still alive keep the memory mapped, a later sweep closes the block once they're gone
+    def release(self):
+        if self.block is None:
+            return
+        block, self.block = self.block, None
+        if not _close(block):
+            with _lingering_lock:
+                _lingering.append(block)
+        sweep()
+
+
+    # a block dropped without being released (e.g. a cancelled import) is freed as well
+    __del__ = release
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# Move the buffers of obj into shared memory, outside of a worker process obj is returned as is
+def share(obj):
+    if multiprocessing.parent_process() is None:
+        return obj
+
+    buffers = []
+    records = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [b.raw() for b in buffers]
+    if not raw_buffers:
+        return obj
+
+    table = []
+    size = 0
+    for raw in raw_buffers:
+        table.append((size, raw.nbytes))
+        size = _align(size + raw.nbytes)
+
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for (offset, nbytes), raw in zip(table, raw_buffers):
+        block.buf[offset:offset + nbytes] = raw
+
+    if os.name == "nt":
+        _worker_blocks.append(block)
+    else:
+        # the parent unlinks the block, it must outlive this worker
+        resource_tracker.unregister(block._name, "shared_memory")
+        block.close()
+    return SharedResult(block.name, records, table)
+
+
+# (object, SharedBlock) of a worker result, arrays are views into the block
+def attach(result):
+    sweep()
+    if not isinstance(result, SharedResult):
+        return result, SharedBlock(None)
+
+    block = shared_memory.SharedMemory(name=result.name)
+    if os.name != "nt":
+        # nothing else attaches to it, the mapping stays valid after the name is gone
+        block.unlink()
+    buffers = [block.buf[offset:offset + nbytes] for offset, nbytes in result.table]
+    return pickle.loads(result.records, buffers=buffers), SharedBlock(block)
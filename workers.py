@@ -0,0 +1,184 @@
+import os, sys, types, runpy, threading, importlib, importlib.util, multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Worker processes are spawned from Blender's bundled Python, where the add-on package
+# (e.g. bl_ext.user_default.BlenderTMD2) isn't importable by name. Each worker runs this
+# file through runpy first, which registers the package under the same name as in the
+# parent so the tasks sent to it can be unpickled. Keep this module free of relative imports.
+
+
+# Import the add-on package from path and register it as name
+def load_package(name, path):
+    if name in sys.modules:
+        return sys.modules[name]
+
+    parts = name.split(".")
+    for i in range(1, len(parts)):
+        parent = ".".join(parts[:i])
+        if parent in sys.modules:
+            continue
+        try:
+            importlib.import_module(parent)
+        except ImportError:
+            module = types.ModuleType(parent)
+            module.__path__ = []
+            sys.modules[parent] = module
+
+    spec = importlib.util.spec_from_file_location(name, os.path.join(path, "__init__.py"),
+                                                  submodule_search_locations=[path])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+# Return a spawn-based process pool whose workers can import this add-on
+def process_pool(max_workers = None):
+    package_name = __name__.rpartition(".")[0]
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    init_globals = {"package_name": package_name, "package_dir": package_dir, "cache_settings": None}
+    
+    # workers don't see the add-on preferences, hand them the parent's cache setup
+    cache = sys.modules.get(package_name + ".cache")
+    if cache is not None:
+        init_globals["cache_settings"] = {
+            "directory": os.path.dirname(cache.payload_cache.directory),
+            "enabled": cache.payload_cache.enabled,
+            "models_enabled": cache.model_cache.enabled,
+        }
+
+    return ProcessPoolExecutor(max_workers,
+                               mp_context=multiprocessing.get_context("spawn"),
+                               initializer=runpy.run_path,
+                               initargs=(os.path.abspath(__file__), init_globals, "__tmd2_worker__"))
+
+
+def default_worker_count():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+# Outcome of a job after receive, handed over once so nothing here keeps views into shared memory alive
+class _Handoff:
+    def __init__(self):
+        self.done = threading.Event()
+        self.outcome = (None, None)
+
+
+    def set(self, result, error = None):
+        self.outcome = (result, error)
+        self.done.set()
+
+
+    def take(self):
+        self.done.wait()
+        outcome, self.outcome = self.outcome, (None, None)
+        return outcome
+
+
+def _run(function, args, receive):
+    try:
+        result = function(*args)
+        return (receive(result) if receive else result), None
+    except Exception as e:
+        return None, e
+
+
+def _forward(future, handoff, receive):
+    try:
+        result = future.result()
+        handoff.set(receive(result) if receive else result)
+    except BaseException as e:
+        handoff.set(None, e)
+
+
+# Iterator over the (args, result, error) of the jobs run by pipeline
+class Pipeline:
+    def __init__(self, function, jobs, max_workers = None, window = None, receive = None):
+        self.function = function
+        self.receive = receive
+        self.jobs = deque(jobs)
+        self.pending = deque()
+        self.pool = None
+        
+        if max_workers is None:
+            max_workers = min(default_worker_count(), len(self.jobs))
+        if max_workers <= 1 or len(self.jobs) < 2:
+            return
+        
+        self.pool = process_pool(max_workers)
+        window = window or max_workers * 2
+        while self.jobs and len(self.pending) < window:
+            self.submit(self.jobs.popleft())
+    
+    
+    def submit(self, args):
+        handoff = _Handoff()
+        self.pool.submit(self.function, *args).add_done_callback(lambda f: _forward(f, handoff, self.receive))
+        self.pending.append((args, handoff))
+    
+    
+    # Whether next returns without waiting for a worker
+    def ready(self) -> bool:
+        return not self.pending or self.pending[0][1].done.is_set()
+    
+    
+    def __iter__(self):
+        return self
+    
+    
+    def __next__(self):
+        if self.pool is None:
+            # run in this thread
+            if not self.jobs:
+                raise StopIteration
+            args = self.jobs.popleft()
+            return (args, *_run(self.function, args, self.receive))
+        
+        if not self.pending:
+            self.close()
+            raise StopIteration
+        args, handoff = self.pending.popleft()
+        try:
+            # top the queue back up before handing the result over
+            if self.jobs:
+                self.submit(self.jobs.popleft())
+        except BaseException:
+            self.close()
+            raise
+        return (args, *handoff.take())
+    
+    
+    # Stop early, jobs nobody is going to consume are cancelled
+    def close(self):
+        self.jobs.clear()
+        self.pending.clear()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+    
+    
+    def __enter__(self):
+        return self
+    
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    
+    __del__ = close
+
+
+# Run function(*args) for every job across a process pool, at most window results are in flight or waiting to be consumed
+def pipeline(function, jobs, max_workers = None, window = None, receive = None):
+    return Pipeline(function, jobs, max_workers, window, receive)
+
+
+if __name__ == "__tmd2_worker__":
+    load_package(package_name, package_dir)
+    if cache_settings is not None:
+        importlib.import_module(package_name + ".cache").configure_cache(**cache_settings)